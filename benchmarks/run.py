@@ -0,0 +1,411 @@
+"""
+Benchmarks of the theme hot paths on synthetic posts and CVs.
+
+    python benchmarks/run.py [--sizes 100,1000,10000] [--cv-sizes 10,100,1000]
+                             [--build-sizes 100,1000] [--quick] [--compare FILE]
+
+Startup is measured as ``import sphinx_pj_theme`` for blog-only and CV
+sites, in fresh interpreters and against Sphinx alone. Every benchmark
+reports its best time of ``--repeat`` runs, throughput (items per second)
+and peak memory: traced Python allocations in process, maximum RSS for
+imports and ``sphinx-build`` runs. Results are stored in
+``benchmarks/results/<version>.json`` and compared with the newest other
+result there (or ``--compare``), so regressions show up between versions.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_PATH))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+import sphinx  # noqa: E402
+from docutils import nodes  # noqa: E402
+import sphinx_pj_theme  # noqa: E402
+from sphinx_pj_theme import cv  # noqa: E402
+from sphinx_pj_theme.cv_items import extract_from_toml, render_section  # noqa: E402
+from sphinx_pj_theme.posts import (  # noqa: E402
+    Post, Posts, PostHeaderCache, process_posts_nodes,
+)
+from synthetic import make_posts_tree, make_cv_toml, make_site  # noqa: E402
+
+RESULTS_PATH = os.path.join(BENCHMARKS_PATH, "results")
+# Slower than this ratio against the previous result is flagged
+REGRESSION_RATIO = 1.10
+# Pages showing the same listing, as a sidebar or footer one would
+LISTING_PAGES = 100
+CV_SECTIONS = [
+    ("experience", cv.CVExperiences),
+    ("education", cv.CVEducations),
+    ("aptitude", cv.CVAptitudes),
+    ("side-project", cv.CVSideProjects),
+]
+BUILD_CODE = """\
+import sys, resource
+from sphinx.cmd.build import build_main
+code = build_main(sys.argv[1:])
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)
+sys.exit(code)
+"""
+# What each kind of site imports at startup, after Sphinx as builds do.
+# CV sites load the CV items module on their first CV directive
+IMPORT_CODES = {
+    "sphinx": "",
+    "blog": "import sphinx_pj_theme",
+    "cv": "import sphinx_pj_theme\nsphinx_pj_theme.cv.cv_items()",
+}
+IMPORT_CODE = """\
+import sys, time, resource
+import sphinx.application
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+print(seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)
+"""
+
+
+###############################################################################
+# Measuring
+###############################################################################
+def measure(func, repeat=3, setup=None):
+    """
+    Best wall time of ``repeat`` calls of ``func(setup())`` and peak traced
+    memory of one more call. ``setup`` is not measured
+    """
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        func(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return dict(seconds=min(times), peak_kib=peak / 1024)
+
+
+def measure_build(args, repeat=1):
+    """
+    Best wall time and maximum RSS (KiB on Linux) of ``sphinx-build args``
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-c", BUILD_CODE, *args],
+            capture_output=True, text=True,
+        )
+        seconds = time.perf_counter() - start
+        if process.returncode:
+            raise RuntimeError(f"sphinx-build failed:\n{process.stderr}")
+        peak = int(process.stderr.strip().splitlines()[-1])
+        if best is None or seconds < best["seconds"]:
+            best = dict(seconds=seconds, peak_kib=peak)
+    return best
+
+
+def measure_import(code, repeat=1):
+    """
+    Best time and maximum RSS (KiB on Linux) of running ``code`` in a fresh
+    interpreter with Sphinx imported. Timed in process: ``-X importtime``
+    misses modules loaded with ``importlib.import_module``, as the CV one
+    """
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(BENCHMARKS_PATH))
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-c", IMPORT_CODE.format(code=code)],
+            capture_output=True, text=True, env=env,
+        )
+        if process.returncode:
+            raise RuntimeError(f"import failed:\n{process.stderr}")
+        seconds, peak = process.stderr.strip().splitlines()[-1].split()
+        if best is None or float(seconds) < best["seconds"]:
+            best = dict(seconds=float(seconds), peak_kib=int(peak))
+    return best
+
+
+###############################################################################
+# Benchmarks
+###############################################################################
+def bench_import(tmp_path, sizes, repeat):
+    """
+    ``import sphinx_pj_theme`` for blog-only and CV sites
+    """
+    return {
+        f"import[{site}]": dict(measure_import(code, repeat), items=1)
+        for site, code in IMPORT_CODES.items()
+    }
+
+
+def bench_get_posts(tmp_path, sizes, repeat):
+    results = {}
+    for size in sizes:
+        for nested in (False, True):
+            for body in ("small", "large"):
+                if body == "large" and size > 10000:
+                    continue
+                layout = "nested" if nested else "flat"
+                posts_path = os.path.join(tmp_path, f"posts-{size}-{layout}-{body}")
+                make_posts_tree(posts_path, size, nested, body)
+                name = f"get_posts[{size},{layout},{body}]"
+                results[name] = dict(
+                    measure(lambda _: Posts.get_posts(posts_path), repeat),
+                    items=size,
+                )
+                # Warm header cache, as in incremental builds
+                cache_path = os.path.join(tmp_path, f"{layout}-{body}-{size}.pickle")
+                warm = PostHeaderCache(cache_path)
+                Posts.get_posts(posts_path, header_cache=warm)
+                warm.save()
+                results[f"get_posts[{size},{layout},{body},cached]"] = dict(
+                    measure(
+                        lambda cache: Posts.get_posts(posts_path, header_cache=cache),
+                        repeat,
+                        setup=lambda: PostHeaderCache(cache_path),
+                    ),
+                    items=size,
+                )
+                shutil.rmtree(posts_path)
+    return results
+
+
+def bench_post_records(tmp_path, sizes, repeat):
+    """
+    Memory of the post records an index keeps, built from cached headers
+    """
+    results = {}
+    for size in sizes:
+        headers = [
+            dict(
+                title=f"Post number {number}\n",
+                ordinal=733000 + number % 5000,
+                group=f"group{number % 10}",
+                meta={"tags": ["python", "sphinx"]} if number % 2 else {},
+            )
+            for number in range(size)
+        ]
+        results[f"post_records[{size}]"] = dict(
+            measure(
+                lambda _: [
+                    Post.from_header(f"posts/post{number}.rst", header)
+                    for number, header in enumerate(headers)
+                ],
+                repeat,
+            ),
+            items=size,
+        )
+    return results
+
+
+def bench_process_posts_nodes(tmp_path, sizes, repeat):
+    from sphinx.application import Sphinx
+
+    results = {}
+    for size in sizes:
+        site_path = make_site(os.path.join(tmp_path, f"site-nodes-{size}"), size, 1)
+        app = Sphinx(
+            site_path, site_path,
+            os.path.join(site_path, "_build", "html"),
+            os.path.join(site_path, "_build", "doctrees"),
+            "html", status=None, warning=None, freshenv=True,
+        )
+        app.build()
+
+        def setup():
+            # Listings rendered from scratch, not from the build memo
+            for index in app.env.pj_posts_indexes.values():
+                index.fragments = {}
+            return app.env.get_doctree("index")
+
+        results[f"process_posts_nodes[{size}]"] = dict(
+            measure(lambda doctree: process_posts_nodes(app, doctree, "index"),
+                    repeat, setup=setup),
+            items=size,
+        )
+        # The first listing of index on many pages, rendered once before
+        listing = next(iter(app.env.get_doctree("index").findall(Posts)))
+        process_posts_nodes(app, nodes.container("", listing.deepcopy()), "index")
+        docnames = sorted(app.env.found_docs)[:LISTING_PAGES]
+
+        def setup_pages():
+            return [nodes.container("", listing.deepcopy()) for _ in docnames]
+
+        results[f"process_posts_nodes[{size},memo,{len(docnames)} pages]"] = dict(
+            measure(
+                lambda containers: [
+                    process_posts_nodes(app, container, docname)
+                    for container, docname in zip(containers, docnames)
+                ],
+                repeat, setup=setup_pages,
+            ),
+            items=len(docnames),
+        )
+        shutil.rmtree(site_path)
+    return results
+
+
+def bench_cv(tmp_path, sizes, repeat):
+    results = {}
+    for size in sizes:
+        toml_path = make_cv_toml(os.path.join(tmp_path, f"cv-{size}.toml"), size)
+        results[f"extract_from_toml[{size}]"] = dict(
+            measure(lambda _: extract_from_toml(toml_path, "experience"), repeat),
+            items=size,
+        )
+        cache = {}
+        extract_from_toml(toml_path, "experience", cache)
+        results[f"extract_from_toml[{size},cached]"] = dict(
+            measure(lambda _: extract_from_toml(toml_path, "experience", cache), repeat),
+            items=size,
+        )
+        for section, node_class in CV_SECTIONS:
+            items = extract_from_toml(toml_path, section, cache)
+            results[f"process_items[{section},{size}]"] = dict(
+                measure(lambda _: node_class.process_items(items), repeat),
+                items=size,
+            )
+            instances = node_class.process_items(items)
+            results[f"to_html[{section},{size}]"] = dict(
+                measure(
+                    lambda _: render_section(instances, f"cv-{section}", "english"),
+                    repeat,
+                ),
+                items=size,
+            )
+    return results
+
+
+def bench_sphinx_build(tmp_path, sizes, repeat):
+    results = {}
+    for size in sizes:
+        site_path = make_site(os.path.join(tmp_path, f"site-build-{size}"), size, 20)
+        out_path = os.path.join(site_path, "_build", "html")
+        args = ["-q", "-b", "html", "-d", os.path.join(site_path, "_build", "doctrees")]
+        results[f"sphinx-build[{size},fresh]"] = dict(
+            measure_build([*args, "-E", site_path, out_path], repeat),
+            items=size,
+        )
+        results[f"sphinx-build[{size},noop]"] = dict(
+            measure_build([*args, site_path, out_path], repeat),
+            items=size,
+        )
+        # One post edited, as when writing
+        post_path = os.path.join(site_path, "posts", "group0", "post0.rst")
+        with open(post_path, "a") as fff:
+            fff.write("\nEdited.\n")
+        results[f"sphinx-build[{size},one-edit]"] = dict(
+            measure_build([*args, site_path, out_path], 1),
+            items=size,
+        )
+        shutil.rmtree(site_path)
+    return results
+
+
+###############################################################################
+# Results
+###############################################################################
+def print_results(results, previous=None):
+    previous = previous or {}
+    width = max(len(name) for name in results)
+    print(f"{'benchmark':<{width}}  {'seconds':>10}  {'items/s':>12}  {'peak KiB':>10}  change")
+    for name, result in results.items():
+        throughput = result["items"] / result["seconds"] if result["seconds"] else 0
+        change = ""
+        if old := previous.get(name):
+            ratio = result["seconds"] / old["seconds"] if old["seconds"] else 1
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            if ratio > REGRESSION_RATIO:
+                change += " SLOWER"
+        print(
+            f"{name:<{width}}  {result['seconds']:>10.4f}  {throughput:>12.0f}  "
+            f"{result['peak_kib']:>10.0f}  {change}"
+        )
+
+
+def load_previous(compare, results_file):
+    """
+    Results to compare with: ``compare`` or the newest stored file other
+    than ``results_file``
+    """
+    if compare is None:
+        stored = [
+            x for x in glob.glob(os.path.join(RESULTS_PATH, "*.json"))
+            if os.path.abspath(x) != os.path.abspath(results_file)
+        ]
+        if not stored:
+            return None, {}
+        compare = max(stored, key=os.path.getmtime)
+    with open(compare) as fff:
+        return compare, json.load(fff)["results"]
+
+
+def parse_sizes(value):
+    return [int(x) for x in value.split(",") if x.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=parse_sizes, default="100,1000,10000",
+                        help="posts per tree (up to 50000)")
+    parser.add_argument("--cv-sizes", type=parse_sizes, default="10,100,1000",
+                        help="items per CV section")
+    parser.add_argument("--build-sizes", type=parse_sizes, default="100,1000",
+                        help="posts per site for full sphinx-build runs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true",
+                        help="smallest sizes only, one repeat")
+    parser.add_argument("--output", default=None,
+                        help="results file, benchmarks/results/<version>.json by default")
+    parser.add_argument("--compare", default=None, help="results file to compare with")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sizes, args.cv_sizes, args.build_sizes = [100], [10], [100]
+        args.repeat = 1
+    results_file = args.output or os.path.join(
+        RESULTS_PATH, f"{sphinx_pj_theme.__version__}.json"
+    )
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="pj-bench-") as tmp_path:
+        for bench, sizes in [
+            (bench_import, [1]),
+            (bench_get_posts, args.sizes),
+            (bench_post_records, sorted({*args.sizes, 50000})),
+            (bench_process_posts_nodes, args.sizes),
+            (bench_cv, args.cv_sizes),
+            (bench_sphinx_build, args.build_sizes),
+        ]:
+            results.update(bench(tmp_path, sizes, args.repeat))
+    compared, previous = load_previous(args.compare, results_file)
+    if compared:
+        print(f"Compared with {compared}")
+    print_results(results, previous)
+    os.makedirs(os.path.dirname(os.path.abspath(results_file)), exist_ok=True)
+    with open(results_file, "w") as fff:
+        json.dump(dict(
+            version=sphinx_pj_theme.__version__,
+            date=datetime.now().isoformat(timespec="seconds"),
+            python=platform.python_version(),
+            sphinx=sphinx.__version__,
+            machine=platform.platform(),
+            results=results,
+        ), fff, indent=1)
+    print(f"Results written to {results_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Synthetic post trees, CV ``.toml`` files and sites for the benchmarks
+"""
+import os
+import random
+from datetime import date, timedelta
+
+PARAGRAPH = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim "
+    "veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip.\n\n"
+)
+# Paragraphs of the body of each post
+BODY_SIZES = {
+    "small": 2,
+    "large": 1000,
+}
+GROUPS = 10
+TECH_STACK = ["Python", "Docker", "Git", "SQL", "Linux", "AWS", "Rust", "Go"]
+
+
+###############################################################################
+# Posts
+###############################################################################
+def post_source(number, day, body="small", draft=False):
+    title = f"Post number {number}"
+    lines = [
+        f":date: {day.strftime('%d/%m/%Y')}",
+        f":tags: tag{number % 7}, tag{number % 11}",
+    ]
+    if draft:
+        lines.append(":draft: true")
+    lines += ["", "=" * len(title), title, "=" * len(title), ""]
+    return "\n".join(lines) + "\n" + PARAGRAPH * BODY_SIZES[body]
+
+
+def make_posts_tree(posts_path, count, nested=False, body="small", seed=0):
+    """
+    Writes ``count`` posts under ``posts_path``, in ``GROUPS`` group folders
+    if ``nested``. About one in fifty is a draft
+    """
+    rng = random.Random(seed)
+    first_day = date(2010, 1, 1)
+    for number in range(count):
+        folder = posts_path
+        if nested:
+            folder = os.path.join(posts_path, f"group{number % GROUPS}")
+        os.makedirs(folder, exist_ok=True)
+        day = first_day + timedelta(days=rng.randrange(5000))
+        source = post_source(number, day, body, draft=rng.random() < 0.02)
+        with open(os.path.join(folder, f"post{number}.rst"), "w") as fff:
+            fff.write(source)
+    return posts_path
+
+
+###############################################################################
+# CV
+###############################################################################
+def toml_string(value):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def make_cv_toml(toml_path, count, seed=0):
+    """
+    Writes a CV with ``count`` items of every section
+    """
+    rng = random.Random(seed)
+    lines = []
+    for number in range(count):
+        start = 1990 + rng.randrange(30)
+        lines += [
+            "[[experience]]",
+            f"position = {toml_string(f'Position {number}')}",
+            f"employer = {toml_string(f'Employer {number}')}",
+            f'start = "{start}-{rng.randrange(1, 13):02d}"',
+            f'end = "{start + rng.randrange(1, 5)}-{rng.randrange(1, 13):02d}"',
+            f"description = {toml_string(PARAGRAPH.strip())}",
+        ]
+        for project in range(3):
+            stack = ", ".join(toml_string(x) for x in rng.sample(TECH_STACK, 3))
+            lines += [
+                "[[experience.projects]]",
+                f"description = {toml_string(f'Project {number}.{project}')}",
+                f"tech-stack = [{stack}]",
+                f'url = "https://example.com/{number}/{project}"',
+            ]
+        for section in ("education", "certification"):
+            lines += [
+                f"[[{section}]]",
+                f"title = {toml_string(f'{section.title()} {number}')}",
+                f"institution = {toml_string(f'Institution {number}')}",
+                f'when = "{1990 + rng.randrange(30)}-{rng.randrange(1, 13):02d}"',
+                f'url = "https://example.com/{section}/{number}"',
+            ]
+        lines += [
+            "[[aptitude]]",
+            f"name = {toml_string(f'Aptitude {number}')}",
+            f"score = {rng.randrange(11)}",
+            "[[side-project]]",
+            f"title = {toml_string(f'Side project {number}')}",
+            f"description = {toml_string(PARAGRAPH.strip())}",
+            f'url = "https://example.com/side/{number}"',
+        ]
+        for collaborator in range(2):
+            lines += [
+                "[[side-project.collaborators]]",
+                f"name = {toml_string(f'Collaborator {number}.{collaborator}')}",
+                f'url = "https://example.com/people/{collaborator}"',
+            ]
+    with open(toml_path, "w") as fff:
+        fff.write("\n".join(lines) + "\n")
+    return toml_path
+
+
+###############################################################################
+# Site
+###############################################################################
+CONF = """\
+import sys
+sys.path.insert(0, {package_path!r})
+project = "benchmark"
+extensions = ["sphinx_pj_theme"]
+html_theme = "sphinx_pj_theme"
+html_theme_options = {{
+    "owner": "Benchmark",
+    "cv_job_position": {{"english": "Dev"}},
+    "cv_main_info": {{"english": {{}}}},
+}}
+"""
+
+INDEX = """\
+Benchmark
+=========
+
+.. toctree::
+   :glob:
+   :hidden:
+
+   cv
+   posts/**
+
+Latest
+------
+
+.. posts:: posts
+   :limit: 10
+
+All
+---
+
+.. posts:: posts
+   :per-page: 20
+   :archive:
+"""
+
+GROUP_LISTING = """
+{group}
+-------
+
+.. posts:: posts
+   :group: {group}
+   :limit: 10
+"""
+
+CV = """\
+:language: english
+
+CV
+==
+
+.. cv-experiences:: cv.toml
+
+.. cv-educations:: cv.toml
+
+.. cv-certifications:: cv.toml
+
+.. cv-aptitudes:: cv.toml
+
+.. cv-side-projects:: cv.toml
+"""
+
+
+def make_site(site_path, posts, cv_items, nested=True, body="small"):
+    """
+    Sphinx project with ``posts`` posts listed from ``index`` and a CV page
+    with ``cv_items`` items per section
+    """
+    package_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.makedirs(site_path, exist_ok=True)
+    with open(os.path.join(site_path, "conf.py"), "w") as fff:
+        fff.write(CONF.format(package_path=package_path))
+    index = INDEX
+    if nested:
+        index += "".join(
+            GROUP_LISTING.format(group=f"group{x}") for x in range(GROUPS)
+        )
+    with open(os.path.join(site_path, "index.rst"), "w") as fff:
+        fff.write(index)
+    with open(os.path.join(site_path, "cv.rst"), "w") as fff:
+        fff.write(CV)
+    make_cv_toml(os.path.join(site_path, "cv.toml"), cv_items)
+    make_posts_tree(os.path.join(site_path, "posts"), posts, nested, body)
+    return site_path
@@ -26,6 +26,7 @@ setup(
     #},
     packages=["sphinx_pj_theme"],
     include_package_data=True,
+    extras_require={"images": ["Pillow"]},
     entry_points={"sphinx.html_themes": ["sphinx_pj_theme=sphinx_pj_theme"]},
     python_requires=">=3.7",
     classifiers=[
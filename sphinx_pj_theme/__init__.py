@@ -1,12 +1,32 @@
 import os
-from distutils.dir_util import copy_tree
+import shutil
+from functools import partial
+from sphinx.config import ENUM
+from sphinx.util import logging
 from .posts import (
     Posts,
     PostsDirective,
+    purge_posts_listings,
+    merge_posts_listings,
+    update_posts_indexes,
     process_posts_nodes,
+    collect_posts_pages,
+    write_posts_search_index,
     visit_Posts_node,
     depart_Posts_node
 )
+from .search import write_search_shards
+from .feeds import write_feeds, get_feed_paths
+from .icons import write_icons_css
+from .assets import load_assets, update_assets, get_asset
+from .images import update_images, add_image_visitor, get_profile_picture
+from .profiling import (
+    profile_handler,
+    start_profile,
+    purge_profile,
+    merge_profile,
+    report_profile,
+)
 from .cv import (
     CVExperiencesDirective,
     CVEducationsDirective,
@@ -14,11 +34,17 @@ from .cv import (
     CVSideProjectsDirective,
     CVAptitudesDirective,
     create_cv_node_processor,
+    note_cv_files,
+    purge_cv_files,
+    merge_cv_files,
+    update_toml_cache,
 )
 
 __version_info__ = (1, 0, 3)
 __version__ = ".".join(map(str, __version_info__))
 
+logger = logging.getLogger(__name__)
+
 
 LANGUAGE_FLAG_MAPPING = {
     "spanish": '🇪🇸',
@@ -53,17 +79,65 @@ def update_context(app, pagename, templatename, context, doctree):
     Includes `pjnotes_version` in the context
     """
     context["pjnotes_version"] = __version__
+    context["pj_search_shards"] = app.config.pj_search_shard_prefix_length > 0
+    context["pj_asset"] = partial(get_asset, app)
+    context["pj_profile_picture"] = partial(get_profile_picture, app, pagename)
+    context["pj_icons"] = bool(app.config.pj_fontawesome_path)
+    context["pj_feeds"] = (
+        get_feed_paths() if app.config.pj_feeds and app.config.html_baseurl else {}
+    )
     context["language_flag_mapping"] = LANGUAGE_FLAG_MAPPING
     context["language_file_end_mapping"] = LANGUAGE_FILE_END_MAPPING
 
 
+# Editor sources shipped next to the assets but never served
+STATIC_SOURCE_ONLY_SUFFIXES = (".xcf",)
+
+
+def sync_tree(source_dir, target_dir):
+    """
+    Copies the files of ``source_dir`` missing in ``target_dir`` or with a
+    different size or mtime there. Returns number of files and bytes copied
+    """
+    copied_files = copied_bytes = 0
+    for parent_path, _, files in os.walk(source_dir):
+        target_path = os.path.join(
+            target_dir, os.path.relpath(parent_path, source_dir)
+        )
+        for file in files:
+            if file.lower().endswith(STATIC_SOURCE_ONLY_SUFFIXES):
+                continue
+            source_file = os.path.join(parent_path, file)
+            target_file = os.path.join(target_path, file)
+            source_stat = os.stat(source_file)
+            try:
+                target_stat = os.stat(target_file)
+                if (target_stat.st_size == source_stat.st_size and
+                        target_stat.st_mtime_ns == source_stat.st_mtime_ns):
+                    continue
+            except FileNotFoundError:
+                pass
+            os.makedirs(target_path, exist_ok=True)
+            # copy2 keeps mtime, so next build finds the file up to date
+            shutil.copy2(source_file, target_file)
+            copied_files += 1
+            copied_bytes += source_stat.st_size
+    return copied_files, copied_bytes
+
+
 def copy_custom_files(app, exc=None):
     if app.builder.format == 'html' and not exc:
         html_staticdir = os.path.join(app.builder.outdir, '_static')
         source_staticdir = os.path.join(app.builder.srcdir, '_static')
         pjno_staticdir = os.path.join(get_path(), "_static")
-        copy_tree(pjno_staticdir, html_staticdir)
-        copy_tree(source_staticdir, html_staticdir)
+        copied_files = copied_bytes = 0
+        for staticdir in (pjno_staticdir, source_staticdir):
+            files, size = sync_tree(staticdir, html_staticdir)
+            copied_files += files
+            copied_bytes += size
+        logger.info(
+            f"Copied {copied_files} static file(s) ({copied_bytes} bytes)"
+        )
 
 
 def setup(app):
@@ -71,14 +145,49 @@ def setup(app):
     if hasattr(app, "add_html_theme"):
         theme_path = os.path.abspath(os.path.dirname(__file__))
         app.add_html_theme("sphinx_pj_theme", theme_path)
-    app.connect("html-page-context", update_context)
+    app.connect("html-page-context", profile_handler(update_context))
     # Posts Nodes
     app.add_node(
         Posts,
         html=(visit_Posts_node, depart_Posts_node),
     )
     app.add_directive('posts', PostsDirective, override=True)
-    app.connect("doctree-resolved", process_posts_nodes)
+    app.add_config_value("pj_posts_from_env", True, "env")
+    app.add_config_value("pj_posts_workers", 1, "")
+    app.add_config_value(
+        "pj_posts_executor", "thread", "", ENUM("thread", "process")
+    )
+    app.add_config_value("pj_posts_search_index", True, "html")
+    # Search index
+    app.add_config_value("pj_search_shard_prefix_length", 0, "html")
+    app.connect("build-finished", profile_handler(write_search_shards))
+    app.connect("env-purge-doc", profile_handler(purge_posts_listings))
+    app.connect("env-merge-info", profile_handler(merge_posts_listings))
+    app.connect("env-updated", profile_handler(update_posts_indexes))
+    app.connect("doctree-resolved", profile_handler(process_posts_nodes))
+    app.connect("html-collect-pages", profile_handler(collect_posts_pages))
+    app.connect("build-finished", profile_handler(write_posts_search_index))
+    # Feeds
+    app.add_config_value("pj_feeds", False, "html")
+    app.add_config_value("pj_feeds_max_entries", 20, "html")
+    app.connect("build-finished", profile_handler(write_feeds))
+    # Minified, content-hashed assets
+    app.add_config_value("pj_hashed_assets", False, "html")
+    app.add_config_value("pj_assets_manifest", {}, "html")
+    app.connect("config-inited", profile_handler(load_assets))
+    # Before other handlers, as it initializes the builder CSS files again
+    app.connect("builder-inited", profile_handler(update_assets), priority=100)
+    # Responsive images
+    app.add_config_value("pj_images", False, "html")
+    app.add_config_value("pj_image_widths", [320, 640, 960, 1280], "html")
+    app.add_config_value("pj_image_formats", ["avif", "webp"], "html")
+    app.add_config_value("pj_image_sizes", "(max-width: 720px) 100vw, 720px", "html")
+    app.add_config_value("pj_image_workers", 0, "")
+    app.connect("config-inited", profile_handler(add_image_visitor))
+    app.connect("env-updated", profile_handler(update_images))
+    # Icons
+    app.add_config_value("pj_fontawesome_path", None, "html")
+    app.connect("build-finished", profile_handler(write_icons_css))
     # CV Nodes
     for (class_name, directive_str, directive) in [
         ("experience", "cv-experiences", CVExperiencesDirective),
@@ -94,10 +203,25 @@ def setup(app):
         )
         app.add_directive(directive_str, directive, override=True)
         process_func = create_cv_node_processor(node_class, class_name, directive_str)
-        app.connect("doctree-resolved", process_func)
+        app.connect(
+            "doctree-resolved",
+            profile_handler(process_func, f"process_nodes ({directive_str})"),
+        )
+    app.connect("doctree-read", profile_handler(note_cv_files))
+    app.connect("env-purge-doc", profile_handler(purge_cv_files))
+    app.connect("env-merge-info", profile_handler(merge_cv_files))
+    app.connect("env-updated", profile_handler(update_toml_cache))
+
+    # Profiling, first and last so it measures every handler
+    app.add_config_value("pj_profile", False, "")
+    app.add_config_value("pj_profile_output", "", "")
+    app.connect("builder-inited", start_profile, priority=0)
+    app.connect("env-purge-doc", purge_profile)
+    app.connect("env-merge-info", merge_profile)
+    app.connect("build-finished", report_profile, priority=1000)
 
     # Copy static files
-    app.connect('builder-inited', copy_custom_files)
+    app.connect('builder-inited', profile_handler(copy_custom_files))
     return {
         "version": __version__,
         "parallel_read_safe": True,
@@ -0,0 +1,85 @@
+// Filters posts as the query is typed, using the small index written by the
+// posts extension (posts-index.json). The full text index of Sphinx is only
+// downloaded when the reader asks for it (or the URL has ``full=1``).
+var postsSearch = document.getElementById('posts-search');
+var postsResults = document.getElementById('posts-search-results');
+var fullSearch = document.getElementById('posts-search-full');
+var searchInput = document.querySelector('form.search input[name="q"]');
+var searchParams = new URLSearchParams(window.location.search);
+var postsIndex = null;
+
+function escapeHTML(text) {
+    var element = document.createElement('span');
+    element.textContent = text;
+    return element.innerHTML;
+}
+
+function filterPosts(query) {
+    var terms = query.toLowerCase().split(/\s+/).filter(Boolean);
+    if (!terms.length) {
+        return [];
+    }
+    return postsIndex.posts.filter(function (post) {
+        var text = [post[0], post[1]].concat(post[4]).join(' ').toLowerCase();
+        return terms.every(function (term) {
+            return text.indexOf(term) !== -1;
+        });
+    });
+}
+
+function renderPosts(query) {
+    var root = postsSearch.dataset.root;
+    postsResults.innerHTML = filterPosts(query).map(function (post) {
+        var date = post[2].split('-').reverse().join('/');
+        var group = post[1] ? '<span class="post-group">' + escapeHTML(post[1]) + '</span>' : '';
+        return '<li><a href="' + root + post[3] + '"><div class="post-entry">' +
+            group + '<span class="post-date">' + date + '</span>' +
+            '<span class="post-title">' + escapeHTML(post[0]) + '</span> </div></a></li>';
+    }).join('');
+    fullSearch.style.display = query.trim() ? '' : 'none';
+}
+
+function loadScripts(urls) {
+    if (!urls.length) {
+        return;
+    }
+    var script = document.createElement('script');
+    script.src = urls[0];
+    script.onload = function () {
+        loadScripts(urls.slice(1));
+    };
+    document.body.appendChild(script);
+}
+
+function loadFullSearch() {
+    // searchtools.js searches the ``q`` of the URL once searchindex.js is in
+    fullSearch.style.display = 'none';
+    loadScripts(postsSearch.dataset.fullScripts.split(' '));
+}
+
+fullSearch.querySelector('a').addEventListener('click', function (event) {
+    event.preventDefault();
+    searchParams.set('q', searchInput.value);
+    searchParams.set('full', '1');
+    window.location.search = searchParams.toString();
+});
+
+searchInput.value = searchParams.get('q') || '';
+searchInput.addEventListener('input', function () {
+    if (postsIndex) {
+        renderPosts(searchInput.value);
+    }
+});
+
+fetch(postsSearch.dataset.index)
+    .then(function (response) {
+        return response.json();
+    })
+    .then(function (index) {
+        postsIndex = index;
+        renderPosts(searchInput.value);
+    });
+
+if (searchParams.get('full')) {
+    loadFullSearch();
+}
@@ -0,0 +1,45 @@
+// Loads the search index split by term prefix (see sphinx_pj_theme/search.py)
+// fetching only the shards of the words in the query. Needs searchtools.js
+// and language_data.js to be loaded before.
+var shardsUrl = document.getElementById('posts-search').dataset.shards;
+var shardsRoot = shardsUrl.slice(0, shardsUrl.lastIndexOf('/') + 1);
+
+function fetchJSON(url) {
+    return fetch(url).then(function (response) {
+        return response.json();
+    });
+}
+
+function queryPrefixes(query, prefixLength) {
+    // Raw and stemmed words, as Sphinx looks up both
+    var stemmer = new Stemmer();
+    var prefixes = new Set();
+    splitQuery(query.toLowerCase().trim()).forEach(function (word) {
+        prefixes.add(word.slice(0, prefixLength));
+        prefixes.add(stemmer.stemWord(word).slice(0, prefixLength));
+    });
+    return prefixes;
+}
+
+fetchJSON(shardsUrl).then(function (index) {
+    var query = new URLSearchParams(window.location.search).get('q') || '';
+    var shards = index.shards;
+    var numbers = [];
+    queryPrefixes(query, shards.prefix_length).forEach(function (prefix) {
+        if (shards.prefixes.hasOwnProperty(prefix)) {
+            numbers.push(shards.prefixes[prefix]);
+        }
+    });
+    index.terms = {};
+    index.titleterms = {};
+    return Promise.all(numbers.map(function (number) {
+        return fetchJSON(shardsRoot + number + '.json');
+    })).then(function (loaded) {
+        loaded.forEach(function (shard) {
+            Object.assign(index.terms, shard.terms || {});
+            Object.assign(index.titleterms, shard.titleterms || {});
+        });
+        delete index.shards;
+        Search.setIndex(index);
+    });
+});
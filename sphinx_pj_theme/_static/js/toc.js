@@ -1,58 +1,55 @@
-var windowHeight = window.innerHeight;
-var toc = document.querySelector('.toc');
-
 // Factor of screen size that the element must cross
 // before being considered visible
 var TOP_MARGIN = 0.2,
     BOTTOM_MARGIN = 0.1;
 
-window.onscroll = function () {syncview()};
-
-function syncview() {
-    tocItems = [].slice.call(toc.querySelectorAll('li'));
-
-    // Cache element references and measurements
-    tocItems = tocItems.map(function (item) {
+function initToc() {
+    var toc = document.querySelector('.toc');
+    if (!toc) {
+        return;
+    }
+    // Element lookups happen once, scrolling only triggers the observer
+    var tocItems = [].slice.call(toc.querySelectorAll('li')).map(function (item) {
         var anchor = item.querySelector('a');
-        var target = document.getElementById(anchor.getAttribute('href').slice(1));
-
+        var href = anchor ? anchor.getAttribute('href') : '';
         return {
             listItem: item,
-            anchor: anchor,
-            target: target
+            target: href && href.charAt(0) === '#' ? document.getElementById(href.slice(1)) : null
         };
     });
-    tocItems[0].listItem.classList.add('toc-title')
-
-    // Remove missing targets
-    tocItems = tocItems.filter(function (item) {
-        return !!item.target;
+    if (tocItems.length) {
+        tocItems[0].listItem.classList.add('toc-title');
+    }
+    if (!('IntersectionObserver' in window)) {
+        return;
+    }
+    var listItems = new Map();
+    var observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            listItems.get(entry.target).forEach(function (listItem) {
+                listItem.classList.toggle('toc-visible', entry.isIntersecting);
+            });
+        });
+    }, {
+        // Viewport band between both margins, it follows window resizes
+        rootMargin: '-' + (TOP_MARGIN * 100) + '% 0px -' + (BOTTOM_MARGIN * 100) + '% 0px',
+        threshold: 0
     });
-
     tocItems.forEach(function (item) {
-        var targetBounds = item.target.getBoundingClientRect();
-        if (targetBounds.bottom > windowHeight * TOP_MARGIN && targetBounds.top < windowHeight * (1 - BOTTOM_MARGIN)) {
-            //pathStart = Math.min( lastItem.pathStart, pathStart );
-            item.listItem.classList.add('toc-visible');
+        if (!item.target) {
+            return;
         }
-        else {
-            item.listItem.classList.remove('toc-visible');
+        if (!listItems.has(item.target)) {
+            listItems.set(item.target, []);
+            observer.observe(item.target);
         }
+        listItems.get(item.target).push(item.listItem);
     });
-};
-
-/*
-    for (let i = 0; i <= tocItems.length - 1; i++) {
-        console.log(i);
-        let item = tocItems[i];
-        var targetBounds = item.getBoundingClientRect();
-        // Elements inside window
-        if (targetBounds.bottom > windowHeight * TOP_MARGIN && targetBounds.top < windowHeight * (1 - BOTTOM_MARGIN)) {
-            item.classList.add('toc-visible');
-            console.log(targetBounds.bottom)
-        }
-        else {
-            item.classList.remove('toc-visible');
-        }
-    };
-*/
+}
+
+// The TOC is in the sidebar, before the sections it points to
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', initToc);
+} else {
+    initToc();
+}
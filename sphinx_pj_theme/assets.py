@@ -0,0 +1,312 @@
+import os
+import re
+import json
+import hashlib
+from sphinx.util import logging
+from .utils import write_if_changed
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_NAME = "pj_manifest.json"
+ASSET_SUFFIXES = (".css", ".js")
+HASH_LENGTH = 10
+# Strings and comments, so strings are never minified
+CSS_TOKEN_PATTERN = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/""", re.DOTALL
+)
+CSS_SPACE_PATTERN = re.compile(r"\s+")
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*")
+# Not before ``:``, that would turn ``a :hover`` into ``a:hover``
+CSS_COLON_PATTERN = re.compile(r":\s+")
+# Whitespace around line breaks, left in code once comments are dropped
+JS_LINE_BREAK_PATTERN = re.compile(r"[ \t]*\n\s*")
+# ``/`` after these starts a regular expression, not a division
+JS_REGEX_PRECEDING_CHARS = "(,=:[!&|?{};+-*%<>~^"
+JS_REGEX_PRECEDING_WORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+JS_WORD_PATTERN = re.compile(r"[\w$]+$")
+
+
+###############################################################################
+# Minifying
+###############################################################################
+def minify_css(source):
+    """
+    Drops comments and spaces not needed, leaving strings as they are
+    """
+    chunks = []
+    position = 0
+    for match in CSS_TOKEN_PATTERN.finditer(source):
+        chunks.append(minify_css_code(source[position:match.start()]))
+        if match.group(1):
+            chunks.append(match.group(1))
+        position = match.end()
+    chunks.append(minify_css_code(source[position:]))
+    return "".join(chunks).strip() + "\n"
+
+
+def minify_css_code(code):
+    """
+    Minifies CSS without strings or comments, strings are never touched
+    """
+    code = CSS_SPACE_PATTERN.sub(" ", code)
+    code = CSS_COLON_PATTERN.sub(":", code)
+    return CSS_PUNCTUATION_PATTERN.sub(r"\1", code).replace(";}", "}")
+
+
+def is_js_regex_start(code):
+    """
+    Whether a ``/`` after ``code`` starts a regular expression literal
+    """
+    code = code.rstrip()
+    if not code or code[-1] in JS_REGEX_PRECEDING_CHARS:
+        return True
+    word = JS_WORD_PATTERN.search(code)
+    return bool(word) and word.group() in JS_REGEX_PRECEDING_WORDS
+
+
+def skip_js_literal(source, position):
+    """
+    End of the string, template or regular expression literal starting at
+    ``position``
+    """
+    quote = source[position]
+    in_class = False
+    position += 1
+    while position < len(source):
+        char = source[position]
+        if char == "\\":
+            position += 2
+            continue
+        if quote == "/":
+            if char == "[":
+                in_class = True
+            elif char == "]":
+                in_class = False
+            elif char == "/" and not in_class:
+                return position + 1
+        elif char == quote:
+            return position + 1
+        position += 1
+    return position
+
+
+def split_js(source):
+    """
+    ``source`` as ``(kind, text)`` tokens, kind being ``"code"``,
+    ``"literal"`` (strings, templates and regular expressions) or
+    ``"comment"``
+    """
+    tokens = []
+    code_start = position = 0
+    # Code before a ``/``, a literal just ended an expression
+    previous = ""
+    while position < len(source):
+        char = source[position]
+        following = source[position:position + 2]
+        if following == "//":
+            end = source.find("\n", position)
+            kind = "comment"
+        elif following == "/*":
+            end = source.find("*/", position + 2)
+            end = end + 2 if end != -1 else -1
+            kind = "comment"
+        elif char in "'\"`" or (
+            char == "/" and is_js_regex_start(previous + source[code_start:position])
+        ):
+            end = skip_js_literal(source, position)
+            kind = "literal"
+        else:
+            position += 1
+            continue
+        end = len(source) if end == -1 else end
+        if position > code_start:
+            tokens.append(("code", source[code_start:position]))
+            previous = source[code_start:position]
+        tokens.append((kind, source[position:end]))
+        if kind == "literal":
+            previous = "0"
+        code_start = position = end
+    if position > code_start:
+        tokens.append(("code", source[code_start:]))
+    return tokens
+
+
+def minify_js(source):
+    """
+    Conservative: drops comments, blank lines and indentation, leaving
+    literals as they are. Line breaks are kept, so automatic semicolon
+    insertion is unaffected
+    """
+    chunks = []
+    code = []
+    for kind, text in split_js(source):
+        if kind == "literal":
+            chunks.append(JS_LINE_BREAK_PATTERN.sub("\n", "".join(code)))
+            chunks.append(text)
+            code = []
+        elif kind == "comment":
+            # Line comments end before their line break, block comments
+            # spanning lines still end a statement
+            code.append("\n" if text.startswith("/*") and "\n" in text else " ")
+        else:
+            code.append(text)
+    chunks.append(JS_LINE_BREAK_PATTERN.sub("\n", "".join(code)))
+    return "".join(chunks).strip() + "\n"
+
+
+MINIFIERS = {
+    ".css": minify_css,
+    ".js": minify_js,
+}
+
+
+###############################################################################
+# Pipeline
+###############################################################################
+def hashed_name(asset, content):
+    """
+    ``css/name.css`` as ``css/name.<hash of content>.css``
+    """
+    stem, suffix = os.path.splitext(asset)
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}{suffix}"
+
+
+def find_assets(source_dirs):
+    """
+    Every CSS/JS file under ``source_dirs`` by its name relative to them.
+    Files in later directories override those in earlier ones
+    """
+    assets = {}
+    for source_dir in source_dirs:
+        for parent_path, dirs, files in os.walk(source_dir):
+            for file in files:
+                if file.endswith(ASSET_SUFFIXES):
+                    source_path = os.path.join(parent_path, file)
+                    asset = os.path.relpath(source_path, source_dir)
+                    assets[asset.replace(os.sep, "/")] = source_path
+    return dict(sorted(assets.items()))
+
+
+def load_manifest(target_dir):
+    """
+    Manifest of the previous build, as ``{"assets": {original: hashed},
+    "sources": {original: [path, mtime, size]}}``
+    """
+    try:
+        with open(os.path.join(target_dir, MANIFEST_NAME), encoding="utf-8") as fff:
+            manifest = json.load(fff)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+    return dict(assets=manifest.get("assets", {}), sources=manifest.get("sources", {}))
+
+
+def build_assets(source_dirs, target_dir, previous=None):
+    """
+    Writes every CSS/JS file under ``source_dirs`` minified and with a
+    content-hashed name in ``target_dir``. Returns the manifest, which maps
+    original to hashed names (relative and with ``/`` separators), and the
+    path, mtime and size of their sources. Assets whose source did not
+    change since ``previous`` manifest are not read again
+    """
+    previous = previous or dict(assets={}, sources={})
+    manifest = {}
+    sources = {}
+    for asset, source_path in find_assets(source_dirs).items():
+        stat = os.stat(source_path)
+        sources[asset] = [source_path, stat.st_mtime_ns, stat.st_size]
+        if (hashed := previous["assets"].get(asset)) and (
+            previous["sources"].get(asset) == sources[asset]
+            and os.path.isfile(os.path.join(target_dir, *hashed.split("/")))
+        ):
+            manifest[asset] = hashed
+            continue
+        with open(source_path, encoding="utf-8") as fff:
+            content = MINIFIERS[os.path.splitext(source_path)[1]](fff.read())
+        manifest[asset] = hashed_name(asset, content)
+        target_path = os.path.join(target_dir, *manifest[asset].split("/"))
+        # Same name, same content: written once
+        if not os.path.isfile(target_path):
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            write_if_changed(target_path, content)
+    return manifest, sources
+
+
+def remove_stale_assets(target_dir, previous, manifest):
+    """
+    Removes hashed files of the ``previous`` manifest not in ``manifest``
+    """
+    for hashed in set(previous.values()) - set(manifest.values()):
+        try:
+            os.remove(os.path.join(target_dir, *hashed.split("/")))
+        except FileNotFoundError:
+            pass
+
+
+def apply_manifest(config, manifest):
+    """
+    Links assets by their hashed names, the theme stylesheet too unless the
+    project chose another one
+    """
+    previous_style = config.pj_assets_manifest.get("css/pj_touch.css")
+    if config.html_style is None or config.html_style == previous_style:
+        config.html_style = manifest.get("css/pj_touch.css")
+    config.pj_assets_manifest = manifest
+
+
+###############################################################################
+# Handlers
+###############################################################################
+def load_assets(app, config):
+    """
+    Takes the manifest of the last build when ``pj_hashed_assets`` is on.
+    The environment compares the config with the last build before
+    ``update_assets`` runs, it only sees a change if an asset changed
+    """
+    if config.pj_hashed_assets:
+        manifest = load_manifest(os.path.join(app.outdir, "_static"))
+        apply_manifest(config, manifest["assets"])
+
+
+def update_assets(app):
+    """
+    Runs the asset pipeline on the static files when ``pj_hashed_assets``
+    is on and the builder writes HTML. Project files override the theme
+    ones, as when they are copied. The manifest is kept in the
+    ``pj_assets_manifest`` config value, so pages are written again when
+    an asset changes, and the theme stylesheet is linked by its hashed name
+    """
+    config = app.config
+    if not config.pj_hashed_assets or app.builder.format != "html":
+        return
+    source_dirs = [
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "_static"),
+        os.path.join(app.srcdir, "_static"),
+        *(os.path.join(app.confdir, x) for x in config.html_static_path),
+    ]
+    target_dir = os.path.join(app.builder.outdir, "_static")
+    previous = load_manifest(target_dir)
+    manifest, sources = build_assets(source_dirs, target_dir, previous)
+    remove_stale_assets(target_dir, previous["assets"], manifest)
+    content = json.dumps(
+        dict(assets=manifest, sources=sources), indent=1, sort_keys=True
+    ) + "\n"
+    os.makedirs(target_dir, exist_ok=True)
+    if write_if_changed(os.path.join(target_dir, MANIFEST_NAME), content):
+        logger.info(f"Asset manifest updated: {len(manifest)} asset(s)")
+    apply_manifest(config, manifest)
+    # The builder took both from the config when initialized
+    app.builder.init_css_files()
+    if hasattr(app.builder, "create_build_info"):
+        app.builder.build_info = app.builder.create_build_info()
+
+
+def get_asset(app, asset):
+    """
+    Name to link ``asset`` (relative to ``_static``) with
+    """
+    return app.config.pj_assets_manifest.get(asset, asset)
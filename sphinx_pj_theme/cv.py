@@ -1,306 +1,55 @@
 import os
-import re
-import tomllib
-import pandas as pd
-from pathlib import Path
-from functools import partial
-from dataclasses import dataclass
+from importlib import import_module
 from docutils.parsers.rst import directives
 from sphinx.util.docutils import SphinxDirective
 from docutils import nodes
-from typing import Optional
-from typing import ClassVar
 from sphinx.util import logging
+from .profiling import profiled, profile_directive
 
 logger = logging.getLogger(__name__)
 
 
-TECH_STACK_FA_ICON_MAP = {
-    'Azure': '<i class="fa-solid fa-cloud"></i>',
-    'Azure AD': '<i class="fa-solid fa-address-book"></i>',
-    'Bash': '<i class="fa-solid fa-terminal"></i>',
-    'Celery': '<i class="fa-solid fa-sliders"></i>',
-    'Crowdstrike': '<i class="fa-solid fa-database"></i>',
-    'Dash': '<i class="fa-solid fa-chart-line"></i>',
-    'Dask': '<i class="fa-solid fa-sitemap"></i>',
-    'Docker': '<i class="fa-brands fa-docker"></i>',
-    'Elasticsearch': '<i class="fa-brands fa-searchengin"></i>',
-    'Energyworx': '<i class="fa-solid fa-lightbulb"></i>',
-    'FastAPI': '<i class="fa-solid fa-microchip"></i>',
-    'Flask': '<i class="fa-solid fa-microchip"></i>',
-    'GCP': '<i class="fa-solid fa-cloud"></i>',
-    'Git': '<i class="fa-brands fa-git-alt"></i>',
-    'GoGS': '<i class="fa-solid fa-gear"></i>',
-    'Groovy': '<i class="fa-solid fa-code"></i>',
-    'KVM': '<i class="fa-solid fa-server"></i>',
-    'Keras': '<i class="fa-solid fa-brain"></i>',
-    'Latex': '<i class="fa-regular fa-file-lines"></i>',
-    'Matplotlib': '<i class="fa-solid fa-brush"></i>',
-    'Numpy': '<i class="fa-solid fa-list-ol"></i>',
-    'OpenCV': '<i class="fa-solid fa-eye"></i>',
-    'Pandas': '<i class="fa-solid fa-receipt"></i>',
-    'PowerBI': '<i class="fa-solid fa-paint-roller"></i>',
-    'Python': '<i class="fa-brands fa-python"></i>',
-    'Pytorch': '<i class="fa-solid fa-fire"></i>',
-    'R': '<i class="fa-brands fa-r-project"></i>',
-    'RedHat': '<i class="fa-brands fa-redhat"></i>',
-    'RShiny': '<i class="fa-solid fa-wand-magic-sparkles"></i>',
-    'SQL': '<i class="fa-solid fa-person-digging"></i>',
-    'Scipy': '<i class="fa-solid fa-magnifying-glass-chart"></i>',
-    'Spark': '<i class="fa-solid fa-magnifying-glass-chart"></i>',
-    'Sphinx': '<i class="fa-solid fa-book"></i>',
-    'Splunk': '<i class="fa-solid fa-database"></i>',
-    'Statsmodels': '<i class="fa-solid fa-brain"></i>',
-    'TKinter': '<i class="fa-solid fa-table-columns"></i>',
-    'VBA': '<i class="fa-solid fa-code"></i>',
-    'Xarray': '<i class="fa-solid fa-layer-group"></i>',
-}
-
-
-def as_date(date_str: str) -> pd.Timestamp:
-    end_of_time = (pd.Timestamp.today() + pd.Timedelta('1d')).isoformat()
-    return pd.Timestamp(date_str.replace('Now', end_of_time))
-
-
-def extract_from_toml(filepath: str, field: str) -> list[dict]:
-    """Extracts specific field from ``.toml`` file"""
-    if not os.path.isfile(filepath):
-        raise FileNotFoundError(f"Filepath '{filepath}' does not exist")
-    if not filepath.endswith('toml'):
-        raise TypeError(f"Filepath '{filepath}' is not a TOML file")
-    return tomllib.loads(Path(filepath).read_text(encoding='utf-8')).get(field, [])
-
-
-def parse_meta(meta: dict[str, str]):
+def cv_items():
     """
-    Convert RST meta values to Python objects
+    Imports the CV items module. Deferred so sites without CV don't pay it
     """
-    meta_good = {}
-    for key, value in meta.items():
-        key = key.lower()
-        if value.lower() == "true":
-            meta_good[key] = True
-        elif value.lower() == "false":
-            meta_good[key] = False
-        elif "date" in key.lower():
-            meta_good['date'] = pd.Timestamp(value).strftime("%d/%m/%Y")
-        elif "," in value:
-            meta_good[key] = list(map(str.strip, value.split(',')))
-        else:
-            meta_good[key] = value
-    return meta_good
-
-
-def get_meta_from_source(rst_source: str):
+    return import_module(".cv_items", __package__)
+
+
+def __getattr__(name):
+    # Names moved to ``cv_items`` are still reachable from here
+    if not name.startswith("_"):
+        try:
+            return getattr(cv_items(), name)
+        except AttributeError:
+            pass
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class lazy_item_class:
     """
-    Extracts the meta info from ``.rst`` source file
+    Class attribute resolving to the ``cv_items`` class called ``name``
     """
-    attr_pattern = re.compile(r":([A-Za-z_-]+):\s*([\w_/ ,-]+)")
-    return parse_meta(dict(attr_pattern.findall(rst_source)))
-
-
-# Dataclasses -----------------------------------------------------------------
-@dataclass
-class ExperienceProject:
-    description: str
-    tech_stack: list[str]
-    url: Optional[str] = ''
-    lang: ClassVar[str] = 'english'
-
-    def to_html(self, indent: int = 0):
-        return '\n'.join((
-            f'{" " * indent}<li class="cv-item-inner">',
-            f'{" " * indent}  <a href="{self.url}">' if self.url else '',
-            f'{" " * indent}  {self.description}',
-            f'{" " * indent}  </a>' if self.url else '',
-            self.to_html_tech_stack(indent+2),
-            f'{" " * indent}</li>'
-        ))
-
-    def to_html_tech_stack(self, indent: int = 0):
-
-        def tech_to_html(tech: str, indent: int = 0):
-            return (
-                f'{" " * indent}<span class="cv-tech-stack-tag">'
-                f'{" " * indent}{TECH_STACK_FA_ICON_MAP.get(tech, "")}'
-                f'{" " * indent}{tech}'
-                f'{" " * indent}</span>'
-            )
-
-        if not self.tech_stack:
-            return ''
-
-        return '\n'.join((
-            f'{" " * indent}<p class="cv-tech-stack">',
-            '\n'.join(tech_to_html(tech, indent+2) for tech in self.tech_stack),
-            f'{" " * indent}</p>'
-        ))
-
-
-@dataclass
-class CVExperience:
-    position: str
-    employer: str
-    start: str
-    end: str
-    description: Optional[str] = ''
-    projects: list[ExperienceProject] = None
-    lang: ClassVar[str] = 'english'
-
-    def __post_init__(self):
-        self.projects = self.projects or []
-
-    def to_html(self, indent: int = 0):
-        return '\n'.join((
-            f'{" " * indent}<li class="cv-item">',
-            f'{" " * indent}  <div class="cv-item-main">',
-            self.to_html_title(indent+4),
-            f'{" " * indent}    <span class="cv-when">{self.start} - {self.end}</span>',
-            f'{" " * indent}  </div>',
-            f'{" " * indent}  <div class="cv-item-info">',
-            f'{" " * indent}  <p>{self.description}</p>' if self.description else '',
-            self.to_html_projects(indent+2),
-            f'{" " * indent}  </div>',
-            f'{" " * indent}</li>'
-        ))
-
-    def to_html_title(self, indent: int = 0):
-        ligature = 'at' if self.lang == 'english' else 'para'
-        return (
-            f'{" " * indent}<p class="cv-job">'
-            f'<span class="cv-job-position">{self.position}</span>'
-            f' {ligature} '
-            f'<span class="cv-job-employer">{self.employer}</span>'
-            f'{" " * indent}</p>'
-        )
 
-    def to_html_projects(self, indent: int = 0):
-        if not self.projects:
-            return ''
-        return '\n'.join((
-            f'{" " * indent}<ul class="cv-experience-projects">',
-            '\n'.join(proj.to_html(indent+2) for proj in self.projects),
-            f'{" " * indent}</ul>'
-        ))
-
-
-@dataclass
-class CVEvent:
-    title: str
-    institution: str
-    when: str
-    url: Optional[str] = ''
-    lang: ClassVar[str] = 'english'
-
-    def to_html(self, indent: int = 0):
-        return '\n'.join((
-            f'{" " * indent}<li class="cv-item">',
-            f'{" " * indent}  <div class="cv-item-main">',
-            f'{" " * indent}    <a href="{self.url}">' if self.url else '',
-            f'{" " * indent}    {self.title}',
-            f'{" " * indent}    </a>' if self.url else '',
-            f'{" " * indent}    <span class="cv-when">{self.when}</span>',
-            f'{" " * indent}  </div>',
-            f'{" " * indent}  <div class="cv-item-info">',
-            f'{" " * indent}  <p>{self.institution}</p>',
-            f'{" " * indent}  </div>',
-            f'{" " * indent}</li>'
-        ))
-
-
-@dataclass
-class CVSideProjectCollaborator:
-    name: str
-    url: Optional[str] = ''
-    lang: ClassVar[str] = 'english'
-
-    def __post_init__(self):
-        if re.match(r'^(\w-.])+@(\w-+\.)+(\w){2,4}$', self.url):
-            self.url = f'mailto:{self.url}'
-        else:
-            self.url = self.url
-
-    def to_html(self, indent: int = 0):
-        return '\n'.join((
-            f'{" " * indent}<li class="cv-item-inner">',
-            f'{" " * indent}  <a href="{self.url}">' if self.url else '',
-            f'{" " * indent}  {self.name}',
-            f'{" " * indent}  </a>' if self.url else '',
-            f'{" " * indent}</li>'
-        ))
-
-
-@dataclass
-class CVSideProject:
-    title: str
-    description: str
-    url: Optional[str]
-    collaborators: Optional[list[CVSideProjectCollaborator]] = None
-    lang: ClassVar[str] = 'english'
-
-    def __post_init__(self):
-        self.collaborators = self.collaborators or []
-        self.lang = self.lang or 'english'
-
-    def to_html(self, indent: int = 0):
-        return '\n'.join((
-            f'{" " * indent}<li class="cv-item">',
-            f'{" " * indent}  <div class="cv-item-main">',
-            f'{" " * indent}    <a href="{self.url}">' if self.url else '',
-            f'{" " * indent}    <p class="cv-side-project-title">{self.title}</p>',
-            f'{" " * indent}    </a>' if self.url else '',
-            f'{" " * indent}  </div>',
-            f'{" " * indent}  <div class="cv-item-info">',
-            f'{" " * indent}    <p class="cv-side-project-description">{self.description}</p>',
-            self.to_html_collaborators(indent+2),
-            f'{" " * indent}  </div>',
-            f'{" " * indent}</li>',
-        ))
-
-    def to_html_collaborators(self, indent: int = 0):
-        if not self.collaborators:
-            return ''
-        label = 'Collaborators' if self.lang == 'english' else 'Colaboradores'
-        return '\n'.join((
-            f'{" " * indent}<p class="cv-side-project-collaborators">{label}:</p>',
-            f'{" " * indent}<ul class="cv-side-project-collaborators">',
-            '\n'.join(coll.to_html(indent+2) for coll in self.collaborators),
-            f'{" " * indent}</ul>'
-        ))
-
-
-@dataclass
-class CVAptitude:
-    name: str
-    score: int
-    lang: ClassVar[str] = 'english'
-
-    def __post_init__(self):
-        self.score = max(0, min(10, int(self.score)))
-
-    def to_html(self):
-        return (
-            f'<li class="cv-aptitude">'
-            f'<p>{self.name}</p>'
-            '<div class="progress-bar">'
-            f'<span class="progress" style="max-width:{self.score * 10}%;"></span>'
-            '<span></span>'
-            '</div>'
-            '</li>'
-        )
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return getattr(cv_items(), self.name)
 
 
 # Nodes -----------------------------------------------------------------------
 class CVNode(nodes.Admonition, nodes.Element):
 
-    def __init__(self, *args, lang: str = 'english', **kwargs):
+    def __init__(self, *args, lang: str = '', **kwargs):
         super(nodes.Admonition, self).__init__(*args, **kwargs)
         super(nodes.Element, self).__init__()
-        self.lang = lang or 'english'
+        # Empty means the language of the document, see ``get_doc_language``
+        self.lang = lang
 
 
 class CVAptitudes(CVNode):
-    dataclass = CVAptitude
+    dataclass = lazy_item_class("CVAptitude")
 
     @classmethod
     def process_items(cls, items: list[dict], reverse=True):
@@ -309,7 +58,7 @@ class CVAptitudes(CVNode):
 
 
 class CVSideProjects(CVNode):
-    dataclass = CVSideProject
+    dataclass = lazy_item_class("CVSideProject")
 
     @classmethod
     def process_items(cls, items: list[dict], reverse=True):
@@ -319,7 +68,7 @@ class CVSideProjects(CVNode):
                 x['description'],
                 x.get('url', ''),
                 collaborators=[
-                    CVSideProjectCollaborator(y['name'], y.get('url', ''))
+                    cv_items().CVSideProjectCollaborator(y['name'], y.get('url', ''))
                     for y in x.get('collaborators', [])
                 ],
             ) for x in items
@@ -328,10 +77,11 @@ class CVSideProjects(CVNode):
 
 
 class CVEvents(CVNode):
-    dataclass = CVEvent
+    dataclass = lazy_item_class("CVEvent")
 
     @classmethod
     def process_items(cls, items: list[dict], reverse=True):
+        as_date = cv_items().as_date
         processed_items = [
             cls.dataclass(
                 x['title'],
@@ -356,10 +106,11 @@ class CVCertifications(CVEvents):
 
 
 class CVExperiences(CVNode):
-    dataclass = CVExperience
+    dataclass = lazy_item_class("CVExperience")
 
     @classmethod
     def process_items(cls, items: list[dict], reverse=True):
+        as_date = cv_items().as_date
         processed_items = [
             cls.dataclass(
                 x['position'],
@@ -368,7 +119,7 @@ class CVExperiences(CVNode):
                 x['end'],
                 x.get('description', ''),
                 projects=[
-                    ExperienceProject(
+                    cv_items().ExperienceProject(
                         y['description'],
                         y.get('tech-stack', ''),
                         y.get('url', '')
@@ -405,10 +156,12 @@ class CVTomlDirective(SphinxDirective):
     node_class = None
     """Subclasses must set this to the appropriate admonition node class."""
 
+    @profile_directive
     def run(self):
         if self.node_class is None:
             raise self.error('node_class is not defined. Cannot create node')
         cv_chunk_node = self.node_class(self.arguments[0])
+        self.set_source_info(cv_chunk_node)
         self.state.nested_parse(
             self.content, self.content_offset, cv_chunk_node
         )
@@ -427,13 +180,12 @@ class CVChunkDirective(SphinxDirective):
     node_class = CVEvents
     """Subclasses must set this to the appropriate admonition node class."""
 
+    @profile_directive
     def run(self):
         if self.node_class is None:
             raise self.error('node_class is not defined. Cannot create node')
-        rst_source = (Path(self.env.srcdir) / f"{self.env.docname}.rst").read_text()
-        meta = get_meta_from_source(rst_source)
-        lang = meta.get('language', '')
-        cv_chunk_node = self.node_class(self.arguments[0], lang=lang)
+        cv_chunk_node = self.node_class(self.arguments[0])
+        self.set_source_info(cv_chunk_node)
         self.state.nested_parse(
             self.content, self.content_offset, cv_chunk_node
         )
@@ -461,6 +213,59 @@ class CVCertificationsDirective(CVChunkDirective):
 
 
 # Handlers --------------------------------------------------------------------
+def note_cv_files(app, doctree):
+    """
+    Registers the ``.toml`` files of every CV node as document dependencies
+    """
+    for node in doctree.traverse(CVNode):
+        tomlpath = os.path.abspath(os.path.join(app.confdir, node.rawsource))
+        app.env.note_dependency(tomlpath)
+        if not hasattr(app.env, "pj_cv_files"):
+            app.env.pj_cv_files = {}
+        app.env.pj_cv_files.setdefault(app.env.docname, set()).add(tomlpath)
+
+
+def purge_cv_files(app, env, docname):
+    if hasattr(env, "pj_cv_files"):
+        env.pj_cv_files.pop(docname, None)
+
+
+def merge_cv_files(app, env, docnames, other):
+    if not hasattr(env, "pj_cv_files"):
+        env.pj_cv_files = {}
+    # Only the documents the worker read, its copy of others may be stale
+    other_files = getattr(other, "pj_cv_files", {})
+    env.pj_cv_files.update(
+        (docname, other_files[docname]) for docname in docnames if docname in other_files
+    )
+
+
+def update_toml_cache(app, env):
+    """
+    Parses once per build the ``.toml`` files in use that changed, so every
+    CV section (and every parallel writer) reuses them
+    """
+    tomlpaths = set()
+    for doc_tomlpaths in getattr(env, "pj_cv_files", {}).values():
+        tomlpaths.update(doc_tomlpaths)
+    if not hasattr(env, "pj_toml_cache"):
+        env.pj_toml_cache = {}
+    for tomlpath in set(env.pj_toml_cache) - tomlpaths:
+        del env.pj_toml_cache[tomlpath]
+    for tomlpath in tomlpaths:
+        if os.path.isfile(tomlpath):
+            cv_items().load_toml(tomlpath, env.pj_toml_cache)
+
+
+def get_doc_language(env, docname):
+    """
+    ``:language:`` field of the document, as parsed by Sphinx for any source
+    suffix. English if it has none
+    """
+    language = env.metadata.get(docname, {}).get('language', '')
+    return str(language).strip().lower() or 'english'
+
+
 def create_cv_node_processor(
     node_class: type, node_name: str, css_class: str = ''
 ):
@@ -469,18 +274,21 @@ def create_cv_node_processor(
 
     def process_nodes(app, doctree, fromdocname):
         for node in doctree.traverse(node_class):
-            tomlpath = os.path.join(app.confdir, node.rawsource)
-            toml_content = extract_from_toml(tomlpath, node_name)
-            if not toml_content:
-                logger.warning(f"{tomlpath} does not contain '{node_name}' section")
-                continue
-            node_class.dataclass.lang = node.lang
-            instances = node_class.process_items(toml_content, reverse=True)
-            output = f'<ul class={css_class}>'
-            for instance in instances:
-                output += instance.to_html()
-            output += "</ul>"
-            logger.info(f"Loaded {len(instances)} {node_name}(s) from {tomlpath}")
-            node.replace_self(nodes.raw("", output, format="html"))
+            with profiled(app.config, f"{css_class} section {fromdocname}:{node.line}"):
+                process_node(app, node, fromdocname)
+
+    def process_node(app, node, fromdocname):
+        tomlpath = os.path.join(app.confdir, node.rawsource)
+        toml_content = cv_items().extract_from_toml(
+            tomlpath, node_name, getattr(app.env, "pj_toml_cache", None)
+        )
+        if not toml_content:
+            logger.warning(f"{tomlpath} does not contain '{node_name}' section")
+            return
+        lang = node.lang or get_doc_language(app.env, fromdocname)
+        instances = node_class.process_items(toml_content, reverse=True)
+        output = cv_items().render_section(instances, css_class, lang)
+        logger.info(f"Loaded {len(instances)} {node_name}(s) from {tomlpath}")
+        node.replace_self(nodes.raw("", output, format="html"))
 
     return process_nodes
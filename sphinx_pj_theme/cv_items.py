@@ -0,0 +1,343 @@
+import os
+import re
+import textwrap
+import tomllib
+import jinja2
+from pathlib import Path
+from functools import lru_cache
+from datetime import datetime, date, time, timedelta
+from dataclasses import dataclass
+from typing import Optional
+from typing import ClassVar
+
+
+TECH_STACK_FA_ICON_MAP = {
+    'Azure': '<i class="fa-solid fa-cloud"></i>',
+    'Azure AD': '<i class="fa-solid fa-address-book"></i>',
+    'Bash': '<i class="fa-solid fa-terminal"></i>',
+    'Celery': '<i class="fa-solid fa-sliders"></i>',
+    'Crowdstrike': '<i class="fa-solid fa-database"></i>',
+    'Dash': '<i class="fa-solid fa-chart-line"></i>',
+    'Dask': '<i class="fa-solid fa-sitemap"></i>',
+    'Docker': '<i class="fa-brands fa-docker"></i>',
+    'Elasticsearch': '<i class="fa-brands fa-searchengin"></i>',
+    'Energyworx': '<i class="fa-solid fa-lightbulb"></i>',
+    'FastAPI': '<i class="fa-solid fa-microchip"></i>',
+    'Flask': '<i class="fa-solid fa-microchip"></i>',
+    'GCP': '<i class="fa-solid fa-cloud"></i>',
+    'Git': '<i class="fa-brands fa-git-alt"></i>',
+    'GoGS': '<i class="fa-solid fa-gear"></i>',
+    'Groovy': '<i class="fa-solid fa-code"></i>',
+    'KVM': '<i class="fa-solid fa-server"></i>',
+    'Keras': '<i class="fa-solid fa-brain"></i>',
+    'Latex': '<i class="fa-regular fa-file-lines"></i>',
+    'Matplotlib': '<i class="fa-solid fa-brush"></i>',
+    'Numpy': '<i class="fa-solid fa-list-ol"></i>',
+    'OpenCV': '<i class="fa-solid fa-eye"></i>',
+    'Pandas': '<i class="fa-solid fa-receipt"></i>',
+    'PowerBI': '<i class="fa-solid fa-paint-roller"></i>',
+    'Python': '<i class="fa-brands fa-python"></i>',
+    'Pytorch': '<i class="fa-solid fa-fire"></i>',
+    'R': '<i class="fa-brands fa-r-project"></i>',
+    'RedHat': '<i class="fa-brands fa-redhat"></i>',
+    'RShiny': '<i class="fa-solid fa-wand-magic-sparkles"></i>',
+    'SQL': '<i class="fa-solid fa-person-digging"></i>',
+    'Scipy': '<i class="fa-solid fa-magnifying-glass-chart"></i>',
+    'Spark': '<i class="fa-solid fa-magnifying-glass-chart"></i>',
+    'Sphinx': '<i class="fa-solid fa-book"></i>',
+    'Splunk': '<i class="fa-solid fa-database"></i>',
+    'Statsmodels': '<i class="fa-solid fa-brain"></i>',
+    'TKinter': '<i class="fa-solid fa-table-columns"></i>',
+    'VBA': '<i class="fa-solid fa-code"></i>',
+    'Xarray': '<i class="fa-solid fa-layer-group"></i>',
+}
+
+
+ISO_DATE_PATTERN = re.compile(r"^(\d{4})(?:[-/.](\d{1,2}))?(?:[-/.](\d{1,2}))?$")
+
+
+def as_date(date_str: str) -> datetime:
+    """
+    Parses ``Now`` (tomorrow, so it sorts after any past date), full or
+    partial ISO dates (``2020``, ``2020-05``, ``2020-05-17``) and ISO
+    datetimes. Missing month and day default to 1
+    """
+    date_str = date_str.strip()
+    # Not cached, long-lived processes would keep the first day
+    if date_str == 'Now':
+        return datetime.combine(date.today() + timedelta(days=1), time())
+    return parse_iso_date(date_str)
+
+
+@lru_cache(maxsize=1024)
+def parse_iso_date(date_str: str) -> datetime:
+    if match := ISO_DATE_PATTERN.match(date_str):
+        year, month, day = match.groups()
+        return datetime(int(year), int(month or 1), int(day or 1))
+    return datetime.fromisoformat(date_str)
+
+
+def load_toml(filepath: str, cache: Optional[dict] = None) -> dict:
+    """
+    Parses ``.toml`` file. Given ``cache``, the file is only parsed again
+    if its modification time changed
+    """
+    if not os.path.isfile(filepath):
+        raise FileNotFoundError(f"Filepath '{filepath}' does not exist")
+    if not filepath.endswith('toml'):
+        raise TypeError(f"Filepath '{filepath}' is not a TOML file")
+    filepath = os.path.abspath(filepath)
+    mtime = os.stat(filepath).st_mtime_ns
+    if cache is not None and (cached := cache.get(filepath)) and cached[0] == mtime:
+        return cached[1]
+    content = tomllib.loads(Path(filepath).read_text(encoding='utf-8'))
+    if cache is not None:
+        cache[filepath] = (mtime, content)
+    return content
+
+
+def extract_from_toml(
+    filepath: str, field: str, cache: Optional[dict] = None
+) -> list[dict]:
+    """Extracts specific field from ``.toml`` file"""
+    return load_toml(filepath, cache).get(field, [])
+
+
+# Templates -------------------------------------------------------------------
+# One template per item. A ``[[name]]`` line is replaced by the template of
+# item ``name``, indented as the marker. Templates are composed and compiled
+# once, so no indentation is computed while rendering
+ITEM_TEMPLATES = {
+    "experience_project": """\
+<li class="cv-item-inner">
+{% if item.url %}
+  <a href="{{ item.url }}">{{ item.description }}</a>
+{% else %}
+  {{ item.description }}
+{% endif %}
+{% if item.tech_stack %}
+  <p class="cv-tech-stack">
+  {% for tech in item.tech_stack %}
+    <span class="cv-tech-stack-tag">{{ icons.get(tech, "") }}{{ tech }}</span>
+  {% endfor %}
+  </p>
+{% endif %}
+</li>
+""",
+    "experience": """\
+<li class="cv-item">
+  <div class="cv-item-main">
+    <p class="cv-job"><span class="cv-job-position">{{ item.position }}</span> \
+{{ 'at' if lang == 'english' else 'para' }} \
+<span class="cv-job-employer">{{ item.employer }}</span></p>
+    <span class="cv-when">{{ item.start }} - {{ item.end }}</span>
+  </div>
+  <div class="cv-item-info">
+  {% if item.description %}
+    <p>{{ item.description }}</p>
+  {% endif %}
+  {% if item.projects %}
+    <ul class="cv-experience-projects">
+    {% for item in item.projects %}
+      [[experience_project]]
+    {% endfor %}
+    </ul>
+  {% endif %}
+  </div>
+</li>
+""",
+    "event": """\
+<li class="cv-item">
+  <div class="cv-item-main">
+  {% if item.url %}
+    <a href="{{ item.url }}">{{ item.title }}</a>
+  {% else %}
+    {{ item.title }}
+  {% endif %}
+    <span class="cv-when">{{ item.when }}</span>
+  </div>
+  <div class="cv-item-info">
+    <p>{{ item.institution }}</p>
+  </div>
+</li>
+""",
+    "side_project_collaborator": """\
+<li class="cv-item-inner">
+{% if item.url %}
+  <a href="{{ item.url }}">{{ item.name }}</a>
+{% else %}
+  {{ item.name }}
+{% endif %}
+</li>
+""",
+    "side_project": """\
+<li class="cv-item">
+  <div class="cv-item-main">
+  {% if item.url %}
+    <a href="{{ item.url }}"><p class="cv-side-project-title">{{ item.title }}</p></a>
+  {% else %}
+    <p class="cv-side-project-title">{{ item.title }}</p>
+  {% endif %}
+  </div>
+  <div class="cv-item-info">
+    <p class="cv-side-project-description">{{ item.description }}</p>
+  {% if item.collaborators %}
+    <p class="cv-side-project-collaborators">\
+{{ 'Collaborators' if lang == 'english' else 'Colaboradores' }}:</p>
+    <ul class="cv-side-project-collaborators">
+    {% for item in item.collaborators %}
+      [[side_project_collaborator]]
+    {% endfor %}
+    </ul>
+  {% endif %}
+  </div>
+</li>
+""",
+    "aptitude": """\
+<li class="cv-aptitude"><p>{{ item.name }}</p><div class="progress-bar">\
+<span class="progress" style="max-width:{{ item.score * 10 }}%;"></span>\
+<span></span></div></li>
+""",
+}
+
+SECTION_TEMPLATE = """\
+<ul class="{{ css_class }}">
+{% for item in items %}
+  [[{item}]]
+{% endfor %}
+</ul>
+"""
+
+ITEM_MARKER_PATTERN = re.compile(r"^( *)\[\[(\w+)\]\]\n", re.MULTILINE)
+
+
+def compose_template(source: str) -> str:
+    """
+    Replaces ``[[name]]`` lines in ``source`` by the indented item template
+    """
+    return ITEM_MARKER_PATTERN.sub(
+        lambda x: textwrap.indent(compose_template(ITEM_TEMPLATES[x[2]]), x[1]),
+        source,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_jinja_environment():
+    environment = jinja2.Environment(trim_blocks=True, lstrip_blocks=True)
+    environment.globals["icons"] = TECH_STACK_FA_ICON_MAP
+    return environment
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str, section: bool = False):
+    """
+    Compiled template of item ``name``, or of a list of them if ``section``
+    """
+    if section:
+        source = SECTION_TEMPLATE.replace("{item}", name)
+    else:
+        source = ITEM_TEMPLATES[name]
+    return get_jinja_environment().from_string(compose_template(source))
+
+
+def render_item(item, indent: int = 0, lang: str = 'english') -> str:
+    """
+    Renders a single CV item in ``lang``, indenting the whole block once
+    """
+    html = get_template(item.template).render(item=item, lang=lang)
+    return textwrap.indent(html, " " * indent) if indent else html
+
+
+def render_section(items: list, css_class: str, lang: str = 'english') -> str:
+    """
+    Renders all the items of a CV section in a single template pass
+    """
+    if not items:
+        return f'<ul class="{css_class}"></ul>'
+    template = get_template(type(items[0]).template, section=True)
+    return template.render(items=items, css_class=css_class, lang=lang)
+
+
+# Dataclasses -----------------------------------------------------------------
+@dataclass
+class ExperienceProject:
+    description: str
+    tech_stack: list[str]
+    url: Optional[str] = ''
+    template: ClassVar[str] = 'experience_project'
+
+    def to_html(self, indent: int = 0, lang: str = 'english'):
+        return render_item(self, indent, lang)
+
+
+@dataclass
+class CVExperience:
+    position: str
+    employer: str
+    start: str
+    end: str
+    description: Optional[str] = ''
+    projects: list[ExperienceProject] = None
+    template: ClassVar[str] = 'experience'
+
+    def __post_init__(self):
+        self.projects = self.projects or []
+
+    def to_html(self, indent: int = 0, lang: str = 'english'):
+        return render_item(self, indent, lang)
+
+
+@dataclass
+class CVEvent:
+    title: str
+    institution: str
+    when: str
+    url: Optional[str] = ''
+    template: ClassVar[str] = 'event'
+
+    def to_html(self, indent: int = 0, lang: str = 'english'):
+        return render_item(self, indent, lang)
+
+
+@dataclass
+class CVSideProjectCollaborator:
+    name: str
+    url: Optional[str] = ''
+    template: ClassVar[str] = 'side_project_collaborator'
+
+    def __post_init__(self):
+        if re.match(r'^(\w-.])+@(\w-+\.)+(\w){2,4}$', self.url):
+            self.url = f'mailto:{self.url}'
+        else:
+            self.url = self.url
+
+    def to_html(self, indent: int = 0, lang: str = 'english'):
+        return render_item(self, indent, lang)
+
+
+@dataclass
+class CVSideProject:
+    title: str
+    description: str
+    url: Optional[str]
+    collaborators: Optional[list[CVSideProjectCollaborator]] = None
+    template: ClassVar[str] = 'side_project'
+
+    def __post_init__(self):
+        self.collaborators = self.collaborators or []
+
+    def to_html(self, indent: int = 0, lang: str = 'english'):
+        return render_item(self, indent, lang)
+
+
+@dataclass
+class CVAptitude:
+    name: str
+    score: int
+    template: ClassVar[str] = 'aptitude'
+
+    def __post_init__(self):
+        self.score = max(0, min(10, int(self.score)))
+
+    def to_html(self, indent: int = 0, lang: str = 'english'):
+        return render_item(self, indent, lang)
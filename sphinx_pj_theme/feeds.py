@@ -0,0 +1,208 @@
+import os
+import json
+import shutil
+from datetime import timezone
+from email.utils import format_datetime
+from xml.etree import ElementTree
+from sphinx.util import logging
+from .posts import get_listed_posts, group_slug
+from .utils import write_if_changed
+
+logger = logging.getLogger(__name__)
+
+
+FEEDS_DIR = "feeds"
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+FEED_FILES = {
+    "atom": "atom.xml",
+    "rss": "rss.xml",
+    "json": "feed.json",
+}
+
+
+###############################################################################
+# Entries
+###############################################################################
+def get_feed_entries(app, posts):
+    """
+    Everything a feed shows of ``posts``: id/link, title, date, group and
+    summary (``:summary:`` meta field, if any)
+    """
+    base_url = app.config.html_baseurl.rstrip("/") + "/"
+    entries = []
+    for docname, post in posts:
+        summary = post.meta.get("summary", "")
+        entries.append(dict(
+            link=base_url + app.builder.get_target_uri(docname),
+            title=post.title.strip(),
+            date=post.date,
+            group=post.group,
+            summary=", ".join(summary) if isinstance(summary, list) else summary,
+        ))
+    return entries
+
+
+def get_feed_author(app):
+    """
+    Author of the feeds: the ``owner`` theme option, or the project
+    """
+    return app.config.html_theme_options.get("owner") or app.config.project
+
+
+def get_feeds(app, max_entries):
+    """
+    Site feed and one feed per group, as ``{slug: (title, entries)}`` with
+    slug ``""`` for the site. Every feed keeps its ``max_entries`` newest
+    """
+    listed = get_listed_posts(app)
+    feeds = {"": (app.config.project, listed[:max_entries])}
+    for group in sorted({post.group for _, post in listed if post.group}):
+        slug = group_slug(group)
+        if not slug:
+            continue
+        posts = [(docname, post) for docname, post in listed if post.group == group]
+        feeds[slug] = (f"{app.config.project} - {group}", posts[:max_entries])
+    return {
+        slug: (title, get_feed_entries(app, posts))
+        for slug, (title, posts) in feeds.items()
+    }
+
+
+###############################################################################
+# Formats
+###############################################################################
+def isoformat(date):
+    # Naive dates are taken as UTC, as feeds require a timezone
+    return date.strftime("%Y-%m-%dT%H:%M:%S") + (date.strftime("%z") or "+00:00")
+
+
+def rfc822(date):
+    # Not ``strftime``, day and month names would follow the locale
+    return format_datetime(date if date.tzinfo else date.replace(tzinfo=timezone.utc))
+
+
+def tag(name):
+    return f"{{{ATOM_NAMESPACE}}}{name}"
+
+
+def render_atom(title, feed_url, site_url, entries, author):
+    ElementTree.register_namespace("", ATOM_NAMESPACE)
+    feed = ElementTree.Element(tag("feed"))
+    ElementTree.SubElement(feed, tag("id")).text = feed_url
+    ElementTree.SubElement(feed, tag("title")).text = title
+    # Newest entry date, so the feed only changes when its entries do
+    updated = entries[0]["date"] if entries else None
+    ElementTree.SubElement(feed, tag("updated")).text = (
+        isoformat(updated) if updated else "1970-01-01T00:00:00+00:00"
+    )
+    ElementTree.SubElement(feed, tag("link"), href=site_url)
+    ElementTree.SubElement(feed, tag("link"), href=feed_url, rel="self")
+    # Entries without author take the one of the feed
+    feed_author = ElementTree.SubElement(feed, tag("author"))
+    ElementTree.SubElement(feed_author, tag("name")).text = author
+    for entry in entries:
+        item = ElementTree.SubElement(feed, tag("entry"))
+        ElementTree.SubElement(item, tag("id")).text = entry["link"]
+        ElementTree.SubElement(item, tag("title")).text = entry["title"]
+        ElementTree.SubElement(item, tag("updated")).text = isoformat(entry["date"])
+        ElementTree.SubElement(item, tag("link"), href=entry["link"])
+        if entry["group"]:
+            ElementTree.SubElement(item, tag("category"), term=entry["group"])
+        if entry["summary"]:
+            ElementTree.SubElement(item, tag("summary")).text = entry["summary"]
+    return ElementTree.tostring(feed, encoding="unicode", xml_declaration=True)
+
+
+def render_rss(title, feed_url, site_url, entries, author):
+    rss = ElementTree.Element("rss", version="2.0")
+    channel = ElementTree.SubElement(rss, "channel")
+    ElementTree.SubElement(channel, "title").text = title
+    ElementTree.SubElement(channel, "link").text = site_url
+    ElementTree.SubElement(channel, "description").text = title
+    if entries:
+        ElementTree.SubElement(channel, "lastBuildDate").text = (
+            rfc822(entries[0]["date"])
+        )
+    for entry in entries:
+        item = ElementTree.SubElement(channel, "item")
+        ElementTree.SubElement(item, "title").text = entry["title"]
+        ElementTree.SubElement(item, "link").text = entry["link"]
+        ElementTree.SubElement(item, "guid").text = entry["link"]
+        ElementTree.SubElement(item, "pubDate").text = (
+            rfc822(entry["date"])
+        )
+        if entry["group"]:
+            ElementTree.SubElement(item, "category").text = entry["group"]
+        if entry["summary"]:
+            ElementTree.SubElement(item, "description").text = entry["summary"]
+    return ElementTree.tostring(rss, encoding="unicode", xml_declaration=True)
+
+
+def render_json(title, feed_url, site_url, entries, author):
+    feed = dict(
+        version="https://jsonfeed.org/version/1.1",
+        title=title,
+        home_page_url=site_url,
+        feed_url=feed_url,
+        authors=[dict(name=author)],
+        items=[
+            dict(
+                id=entry["link"],
+                url=entry["link"],
+                title=entry["title"],
+                date_published=isoformat(entry["date"]),
+                **({"tags": [entry["group"]]} if entry["group"] else {}),
+                **({"summary": entry["summary"]} if entry["summary"] else {}),
+            )
+            for entry in entries
+        ],
+    )
+    return json.dumps(feed, ensure_ascii=False, indent=1)
+
+
+FEED_RENDERERS = {
+    "atom": render_atom,
+    "rss": render_rss,
+    "json": render_json,
+}
+
+
+###############################################################################
+# Handlers
+###############################################################################
+def get_feed_paths(slug=""):
+    """
+    Feed files of the site (``slug=""``) or a group, relative to outdir
+    """
+    feed_dir = "/".join(filter(None, (FEEDS_DIR, slug)))
+    return {kind: f"{feed_dir}/{file}" for kind, file in FEED_FILES.items()}
+
+
+def write_feeds(app, exc=None):
+    """
+    Writes Atom, RSS and JSON feeds for the site and every group of posts
+    under ``feeds/``. Each file is rewritten only if its entries changed, so
+    unchanged feeds keep their mtime
+    """
+    if exc or app.builder.format != "html" or not app.config.pj_feeds:
+        return
+    if not app.config.html_baseurl:
+        logger.warning("pj_feeds needs html_baseurl to build absolute links")
+        return
+    base_url = app.config.html_baseurl.rstrip("/") + "/"
+    feeds_dir = os.path.join(app.builder.outdir, FEEDS_DIR)
+    written = 0
+    feeds = get_feeds(app, app.config.pj_feeds_max_entries)
+    author = get_feed_author(app)
+    for slug, (title, entries) in feeds.items():
+        os.makedirs(os.path.join(feeds_dir, slug), exist_ok=True)
+        for kind, path in get_feed_paths(slug).items():
+            content = FEED_RENDERERS[kind](
+                title, base_url + path, base_url, entries, author
+            )
+            written += write_if_changed(os.path.join(app.builder.outdir, path), content)
+    # Feeds of groups that are gone
+    for entry in os.scandir(feeds_dir):
+        if entry.is_dir() and entry.name not in feeds:
+            shutil.rmtree(entry.path)
+    logger.info(f"Built {len(feeds)} feed(s), {written} file(s) updated")
@@ -0,0 +1,209 @@
+import os
+import re
+import base64
+import pickle
+from sphinx.util import logging
+from .utils import write_if_changed
+
+logger = logging.getLogger(__name__)
+
+
+ICONS_CSS = "css/pj_icons.css"
+CLASS_PATTERN = re.compile(r"""class=["']([^"']*\bfa[^"']*)["']""")
+# Prefix classes of each Font Awesome style, v5 and v6 names
+STYLE_CLASSES = {
+    "fa": None,
+    "fas": "solid",
+    "fa-solid": "solid",
+    "far": "regular",
+    "fa-regular": "regular",
+    "fab": "brands",
+    "fa-brands": "brands",
+}
+# Style tried for icons without an explicit one, as Font Awesome does
+STYLES = ("solid", "regular", "brands")
+MODIFIER_PATTERN = re.compile(
+    r"^fa-(fw|xs|sm|lg|[0-9]+x|spin|pulse|border|inverse|li|ul|pull-\w+|"
+    r"flip-\w+|rotate-\w+|stack(-\w+)?)$"
+)
+# Icons renamed in Font Awesome 6, as (v6 name, v4/v5 name). Templates use
+# both, so either download can draw them
+RENAMED_ICONS = [
+    ("arrow-up-right-from-square", "external-link-alt"),
+    ("calendar-days", "calendar-alt"),
+    ("chart-column", "chart-bar"),
+    ("circle-info", "info-circle"),
+    ("earth-europe", "globe-europe"),
+    ("face-smile", "smile"),
+    ("file-lines", "file-alt"),
+    ("gear", "cog"),
+    ("gears", "cogs"),
+    ("house", "home"),
+    ("list-check", "tasks"),
+    ("location-dot", "map-marker-alt"),
+    ("location-pin", "map-marker"),
+    ("magnifying-glass", "search"),
+    ("magnifying-glass-chart", "search"),
+    ("paintbrush", "paint-brush"),
+    ("pen-to-square", "edit"),
+    ("person-digging", "digging"),
+    ("right-from-bracket", "sign-out-alt"),
+    ("screwdriver-wrench", "tools"),
+    ("sliders", "sliders-h"),
+    ("square-facebook", "facebook-square"),
+    ("square-github", "github-square"),
+    ("square-phone", "phone-square"),
+    ("square-twitter", "twitter-square"),
+    ("table-columns", "columns"),
+    ("trash-can", "trash-alt"),
+    ("wand-magic", "magic"),
+    ("wand-magic-sparkles", "magic"),
+    ("xmark", "times"),
+]
+ICON_ALIASES = {}
+for new_name, old_name in RENAMED_ICONS:
+    ICON_ALIASES.setdefault(new_name, []).append(old_name)
+    ICON_ALIASES.setdefault(old_name, []).append(new_name)
+SVG_COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
+ICONS_CSS_HEADER = """\
+/* Font Awesome Free icons in use, generated by sphinx_pj_theme.
+ * Font Awesome Free by @fontawesome - https://fontawesome.com
+ * License - https://fontawesome.com/license/free (Icons: CC BY 4.0) */
+.fa, .fas, .far, .fab, .fa-solid, .fa-regular, .fa-brands {
+  display: inline-block;
+  width: 1em;
+  height: 1em;
+  vertical-align: -0.125em;
+  background-color: currentColor;
+  -webkit-mask: var(--pj-icon) no-repeat center / contain;
+  mask: var(--pj-icon) no-repeat center / contain;
+}
+"""
+
+
+###############################################################################
+# Collecting
+###############################################################################
+def parse_icon_classes(html):
+    """
+    Returns ``(style, name)`` of every Font Awesome icon in ``html``, style
+    being ``None`` if the icon does not set it
+    """
+    icons = set()
+    for class_attr in CLASS_PATTERN.findall(html):
+        classes = class_attr.split()
+        styles = [STYLE_CLASSES[x] for x in classes if x in STYLE_CLASSES]
+        if not styles:
+            continue
+        style = next(filter(None, styles), None)
+        for name in classes:
+            if (name.startswith("fa-") and name not in STYLE_CLASSES
+                    and not MODIFIER_PATTERN.match(name)):
+                icons.add((style, name[3:]))
+    return icons
+
+
+def collect_icons(outdir, cache_path):
+    """
+    Icons used by the HTML pages under ``outdir``. Pages are only read again
+    when their mtime or size changed since the last build
+    """
+    try:
+        with open(cache_path, "rb") as fff:
+            cache = pickle.load(fff)
+    except Exception:
+        cache = {}
+    pages = {}
+    for parent_path, dirs, files in os.walk(outdir):
+        dirs[:] = [x for x in dirs if x not in ("_static", "_sources")]
+        for file in files:
+            if not file.endswith(".html"):
+                continue
+            page_path = os.path.join(parent_path, file)
+            stat = os.stat(page_path)
+            entry = cache.get(page_path)
+            if not entry or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+                with open(page_path, encoding="utf-8", errors="replace") as fff:
+                    entry = (stat.st_mtime_ns, stat.st_size, parse_icon_classes(fff.read()))
+            pages[page_path] = entry
+    if pages != cache:
+        with open(cache_path, "wb") as fff:
+            pickle.dump(pages, fff, pickle.HIGHEST_PROTOCOL)
+    icons = set()
+    for _, _, page_icons in pages.values():
+        icons.update(page_icons)
+    return icons
+
+
+###############################################################################
+# Subsetting
+###############################################################################
+def find_icon_svg(fontawesome_path, style, name):
+    """
+    SVG file of icon ``name`` (or of its other names) in a Font Awesome Free
+    download, or ``None``
+    """
+    for icon_name in (name, *ICON_ALIASES.get(name, ())):
+        for svgs_path in (os.path.join(fontawesome_path, "svgs"), fontawesome_path):
+            for icon_style in (style,) if style else STYLES:
+                svg_path = os.path.join(svgs_path, icon_style, f"{icon_name}.svg")
+                if os.path.isfile(svg_path):
+                    return svg_path
+    return None
+
+
+def icon_selectors(style, name):
+    if style is None:
+        return [f".fa-{name}"]
+    return [
+        f".{prefix}.fa-{name}" for prefix, prefix_style in STYLE_CLASSES.items()
+        if prefix_style == style
+    ]
+
+
+def get_icons_css(fontawesome_path, icons):
+    """
+    CSS drawing every icon in ``icons`` from its SVG, as a mask so it takes
+    the text color. Returns the CSS and the icons not found
+    """
+    rules = [ICONS_CSS_HEADER]
+    missing = []
+    # Icons without style first, so explicit styles override them
+    for style, name in sorted(icons, key=lambda x: (x[0] is not None, x[0] or "", x[1])):
+        if (svg_path := find_icon_svg(fontawesome_path, style, name)) is None:
+            missing.append(f"{style or 'fa'} {name}")
+            continue
+        with open(svg_path, encoding="utf-8") as fff:
+            svg = SVG_COMMENT_PATTERN.sub("", fff.read()).strip()
+        data = base64.b64encode(svg.encode("utf-8")).decode("ascii")
+        rules.append(
+            f"{', '.join(icon_selectors(style, name))} "
+            f'{{ --pj-icon: url("data:image/svg+xml;base64,{data}"); }}\n'
+        )
+    return "".join(rules), missing
+
+
+###############################################################################
+# Handlers
+###############################################################################
+def write_icons_css(app, exc=None):
+    """
+    Writes ``_static/css/pj_icons.css`` with the Font Awesome icons the
+    written pages use, taken from ``pj_fontawesome_path``
+    """
+    fontawesome_path = app.config.pj_fontawesome_path
+    if exc or app.builder.format != "html" or not fontawesome_path:
+        return
+    fontawesome_path = os.path.join(app.confdir, fontawesome_path)
+    icons = collect_icons(
+        app.builder.outdir, os.path.join(app.doctreedir, "pj_icons.pickle")
+    )
+    css, missing = get_icons_css(fontawesome_path, icons)
+    if missing:
+        logger.warning(
+            f"Icons not found in {fontawesome_path}: {', '.join(missing)}"
+        )
+    css_path = os.path.join(app.builder.outdir, "_static", ICONS_CSS)
+    os.makedirs(os.path.dirname(css_path), exist_ok=True)
+    if write_if_changed(css_path, css):
+        logger.info(f"Icons subset written: {len(icons) - len(missing)} icon(s)")
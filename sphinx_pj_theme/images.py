@@ -0,0 +1,288 @@
+import os
+import shutil
+import hashlib
+import posixpath
+from html import escape
+from concurrent.futures import ProcessPoolExecutor
+from docutils import nodes
+from sphinx.util import logging
+from .posts import root_prefix
+
+logger = logging.getLogger(__name__)
+
+
+IMAGES_DIR = "_images"
+CACHE_DIR = "pj_images"
+# Formats Pillow can resize without losing anything the browser shows, by
+# suffix. Not Pillow's format: many phone JPEGs are reported as MPO
+SOURCE_FORMATS = {
+    ".png": "png",
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+}
+SOURCE_SUFFIXES = tuple(SOURCE_FORMATS)
+# Formats offered besides the one of the image
+MODERN_FORMATS = ("avif", "webp")
+MIME_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+}
+SAVE_OPTIONS = {
+    "avif": dict(quality=60),
+    "webp": dict(quality=80, method=4),
+    "png": dict(optimize=True),
+    "jpeg": dict(quality=85, optimize=True, progressive=True),
+}
+
+
+def get_pillow():
+    """
+    Pillow is only needed with ``pj_images`` on, so it is optional
+    """
+    try:
+        from PIL import Image, features
+    except ImportError:
+        return None, None
+    return Image, features
+
+
+###############################################################################
+# Derivatives
+###############################################################################
+def encode_derivative(source_path, cache_path, width, image_format):
+    """
+    Writes ``source_path`` resized to ``width`` as ``image_format`` in
+    ``cache_path``. Module level so processes can run it
+    """
+    Image, _ = get_pillow()
+    with Image.open(source_path) as image:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.LANCZOS)
+        if image_format == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        tmp_path = f"{cache_path}.tmp"
+        image.save(tmp_path, image_format.upper(), **SAVE_OPTIONS[image_format])
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def plan_derivatives(source_path, digest, image_width, source_format, widths, formats):
+    """
+    ``(width, format, name)`` of every derivative of an image: each width
+    bucket narrower than the image, in every format plus its own. Other
+    formats also get the full width, the image itself is its own
+    """
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    plan = []
+    for width in [x for x in sorted(set(widths)) if x < image_width] + [image_width]:
+        for image_format in (*formats, source_format):
+            if width == image_width and image_format == source_format:
+                continue
+            suffix = "jpg" if image_format == "jpeg" else image_format
+            plan.append((width, image_format, f"{stem}.{digest[:10]}-{width}.{suffix}"))
+    return plan
+
+
+def file_digest(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fff:
+        for chunk in iter(lambda: fff.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def update_image_entries(app, env, source_paths):
+    """
+    Describes the derivatives of every image in ``source_paths`` in
+    ``env.pj_images``. Images are only hashed again when their mtime or size
+    changed, and derivatives only encoded when not in the cache
+    """
+    Image, features = get_pillow()
+    formats = []
+    for image_format in app.config.pj_image_formats:
+        if image_format not in MODERN_FORMATS or not features.check(image_format):
+            logger.warning(f"Pillow can't write {image_format} images here, skipped")
+            continue
+        formats.append(image_format)
+    widths = tuple(app.config.pj_image_widths)
+    previous = getattr(env, "pj_images", {})
+    env.pj_images = {}
+    cache_dir = os.path.join(app.doctreedir, CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    tasks = []
+    for source_path in sorted(source_paths):
+        stat = os.stat(source_path)
+        key = (stat.st_mtime_ns, stat.st_size, widths, tuple(formats))
+        entry = previous.get(source_path)
+        if not entry or entry["key"] != key:
+            with Image.open(source_path) as image:
+                image_width = image.width
+            image_format = SOURCE_FORMATS[os.path.splitext(source_path)[1].lower()]
+            digest = file_digest(source_path)
+            entry = dict(
+                key=key,
+                width=image_width,
+                format=image_format,
+                derivatives=plan_derivatives(
+                    source_path, digest, image_width, image_format, widths, formats
+                ),
+            )
+        env.pj_images[source_path] = entry
+        for width, image_format, name in entry["derivatives"]:
+            cache_path = os.path.join(cache_dir, name)
+            if not os.path.isfile(cache_path):
+                tasks.append((source_path, cache_path, width, image_format))
+    if tasks:
+        workers = app.config.pj_image_workers or None
+        with ProcessPoolExecutor(workers) as pool:
+            list(pool.map(encode_derivative, *zip(*tasks)))
+        logger.info(f"Encoded {len(tasks)} image derivative(s)")
+
+
+def copy_derivatives(app, env):
+    """
+    Copies the derivatives in use to ``_images``. Names carry the content
+    hash, so existing files are never copied again
+    """
+    images_dir = os.path.join(app.outdir, IMAGES_DIR)
+    os.makedirs(images_dir, exist_ok=True)
+    cache_dir = os.path.join(app.doctreedir, CACHE_DIR)
+    for entry in env.pj_images.values():
+        for _, _, name in entry["derivatives"]:
+            if not os.path.isfile(target_path := os.path.join(images_dir, name)):
+                shutil.copyfile(os.path.join(cache_dir, name), target_path)
+
+
+def get_profile_pic_path(app):
+    """
+    Source of ``cv_profile_pic``: the project static folders override the
+    theme one, as when they are copied
+    """
+    pic = app.config.html_theme_options.get("cv_profile_pic", "cv_profile.png")
+    if not pic:
+        return None
+    static_dirs = [os.path.join(app.confdir, x) for x in app.config.html_static_path]
+    static_dirs.reverse()
+    static_dirs.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "_static"))
+    for static_dir in static_dirs:
+        if os.path.isfile(pic_path := os.path.join(static_dir, pic)):
+            return pic_path
+    return None
+
+
+###############################################################################
+# Markup
+###############################################################################
+def get_sources(env, source_path, source_uri, base_uri):
+    """
+    ``srcset`` of every format of an image, as ``[(mime type, srcset)]``
+    with the format of the image last, ending in ``source_uri``. Empty
+    without derivatives
+    """
+    entry = getattr(env, "pj_images", {}).get(source_path)
+    if not entry or not entry["derivatives"]:
+        return []
+    srcsets = {}
+    for width, image_format, name in entry["derivatives"]:
+        srcsets.setdefault(image_format, []).append(
+            f"{posixpath.join(base_uri, name)} {width}w"
+        )
+    # Images narrower than every width only have other formats
+    source_srcset = srcsets.pop(entry["format"], [])
+    source_srcset.append(f"{source_uri} {entry['width']}w")
+    srcsets[entry["format"]] = source_srcset
+    return [(MIME_TYPES[x], ", ".join(srcset)) for x, srcset in srcsets.items()]
+
+
+def get_picture(env, source_path, source_uri, base_uri, img_tag, sizes):
+    """
+    Wraps ``img_tag`` in a ``<picture>`` offering every derivative, and
+    makes it lazy
+    """
+    sources = get_sources(env, source_path, source_uri, base_uri)
+    img_attrs = ' loading="lazy"'
+    if sources:
+        img_attrs += f' srcset="{escape(sources[-1][1])}" sizes="{escape(sizes)}"'
+    img_tag, newline = img_tag.rstrip("\n"), img_tag[len(img_tag.rstrip("\n")):]
+    img_tag = img_tag.replace("<img ", f"<img{img_attrs} ", 1)
+    if not sources:
+        return img_tag + newline
+    return "<picture>" + "".join(
+        f'<source type="{mime}" srcset="{escape(srcset)}" sizes="{escape(sizes)}" />'
+        for mime, srcset in sources[:-1]
+    ) + img_tag + "</picture>" + newline
+
+
+###############################################################################
+# Handlers
+###############################################################################
+def update_images(app, env):
+    """
+    Makes the derivatives of every image in the documents and of the CV
+    profile picture, when ``pj_images`` is on
+    """
+    if not app.config.pj_images or app.builder.format != "html":
+        return
+    if get_pillow()[0] is None:
+        logger.warning("pj_images needs Pillow (pip install sphinx_pj_theme[images])")
+        return
+    source_paths = {
+        os.path.join(app.srcdir, x) for x in env.images
+        if x.lower().endswith(SOURCE_SUFFIXES)
+    }
+    if (pic_path := get_profile_pic_path(app)) and pic_path.lower().endswith(SOURCE_SUFFIXES):
+        source_paths.add(pic_path)
+    source_paths = {x for x in source_paths if os.path.isfile(x)}
+    update_image_entries(app, env, source_paths)
+    copy_derivatives(app, env)
+
+
+def add_image_visitor(app, config):
+    """
+    Renders images with ``visit_image`` only when ``pj_images`` is on, so
+    other extensions keep their image visitor otherwise
+    """
+    if config.pj_images:
+        app.add_node(nodes.image, override=True, html=(visit_image, depart_image))
+
+
+def visit_image(self, node):
+    """
+    Sphinx HTML image plus lazy loading and derivatives
+    """
+    source_path = os.path.join(self.builder.srcdir, node["uri"])
+    source_uri = posixpath.join(
+        self.builder.imgpath, self.builder.images.get(node["uri"], "")
+    )
+    type(self).visit_image(self, node)
+    if not self.config.pj_images:
+        return
+    for position in range(len(self.body) - 1, -1, -1):
+        if self.body[position].startswith("<img "):
+            self.body[position] = get_picture(
+                self.builder.env, source_path, source_uri, self.builder.imgpath,
+                self.body[position], self.config.pj_image_sizes,
+            )
+            break
+
+
+def depart_image(self, node):
+    type(self).depart_image(self, node)
+
+
+def get_profile_picture(app, pagename):
+    """
+    ``<source>`` list and ``srcset`` of the CV profile picture, for
+    ``sb_cv.html``
+    """
+    if not app.config.pj_images or (pic_path := get_profile_pic_path(app)) is None:
+        return dict(sources=[], srcset="")
+    prefix = root_prefix(app, pagename)
+    pic = app.config.html_theme_options.get("cv_profile_pic", "cv_profile.png")
+    source_uri = f"{prefix}_static/{pic}"
+    sources = get_sources(app.env, pic_path, source_uri, prefix + IMAGES_DIR)
+    if not sources:
+        return dict(sources=[], srcset="")
+    return dict(sources=sources[:-1], srcset=sources[-1][1])
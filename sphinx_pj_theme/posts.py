@@ -1,33 +1,126 @@
 import os
 import re
+import sys
+import json
+import pickle
+import hashlib
+import posixpath
+import unicodedata
 from datetime import datetime
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import ClassVar
 from docutils.parsers.rst import directives
 from sphinx.util.docutils import SphinxDirective
 from docutils import nodes
+from sphinx.util import logging
+from .utils import write_if_changed
+from .profiling import profiled, profile_directive
+
+logger = logging.getLogger(__name__)
+
+
+# Stands for the relative path to the root in memoized listings
+ROOT_PLACEHOLDER = "\x00pj-root\x00"
+
+TITLE_PATTERN = re.compile(r"^[#=]+$")
+META_PATTERN = re.compile(r":([A-Za-z_-]+):\s*([A-Za-z0-9-/ ,]+)")
+GROUP_SLUG_PATTERN = re.compile(r"[^A-Za-z0-9_-]+")
 
 
 ###############################################################################
 # Auxiliar Classes
 ###############################################################################
-@dataclass(init=False)
 class Post:
-    path: str
-    title: str = ""
-    date: datetime = datetime(2000,1,1)
-    group: str = ""
-    meta = {}
-    title_patttern: str = r"^[#=]+$"
+    """
+    Compact post record. Dates are stored as ordinals and group names are
+    interned, as big sites keep tens of thousands of posts in memory
+    """
+    __slots__ = ("path", "title", "ordinal", "_group", "meta")
+    max_header_size: ClassVar[int] = 64 * 1024
 
     def __init__(self, post_path):
         # Path
         self.path = post_path
+        self.title = ""
+        self.group = ""
+        self.meta = {}
         # Date
         timestamp = os.stat(post_path).st_mtime
         self.date = datetime.fromtimestamp(timestamp)
         # Set title and meta
         self.parse_post_header()
 
+    def __repr__(self):
+        return (
+            f"Post(path={self.path!r}, title={self.title!r}, "
+            f"date={self.date!r}, group={self.group!r})"
+        )
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.get_header() == other.get_header() and self.path == other.path
+
+    __hash__ = None
+
+    @property
+    def date(self):
+        return datetime.fromordinal(self.ordinal)
+
+    @date.setter
+    def date(self, value):
+        self.ordinal = value.toordinal()
+
+    @property
+    def group(self):
+        return self._group
+
+    @group.setter
+    def group(self, value):
+        self._group = sys.intern(value)
+
+    @classmethod
+    def from_header(cls, post_path, header):
+        """
+        Builds a post from a header previously returned by ``get_header``
+        """
+        post = cls.__new__(cls)
+        post.path = post_path
+        post.title = header["title"]
+        post.ordinal = header["ordinal"]
+        post.group = header["group"]
+        post.meta = dict(header["meta"])
+        return post
+
+    @classmethod
+    def from_env(cls, env, docname):
+        """
+        Builds a post from the title and metadata Sphinx already parsed. The
+        source file is only checked for its mtime when it has no ``:date:``
+        """
+        post = cls.__new__(cls)
+        post.path = str(env.doc2path(docname))
+        post.title = env.titles[docname].astext()
+        post.ordinal = None
+        post.group = ""
+        post.meta = {}
+        for key, value in env.metadata.get(docname, {}).items():
+            post.parse_meta_values(key, str(value))
+        if post.ordinal is None:
+            post.date = datetime.fromtimestamp(os.stat(post.path).st_mtime)
+        return post
+
+    def get_header(self):
+        """
+        Returns the parsed header fields, as stored in ``PostHeaderCache``
+        """
+        return dict(
+            title=self.title,
+            ordinal=self.ordinal,
+            group=self.group,
+            meta=dict(self.meta),
+        )
+
     def parse_meta_values(self, key, value):
         """
         Parser for meta values
@@ -40,26 +133,121 @@ class Post:
             value_right = value.replace("-", "/")
             self.date = datetime.strptime(value_right, "%d/%m/%Y")
         elif "," in value:
-            value = list(map(str.strip, value.split(',')))
+            self.meta[key.lower()] = list(map(str.strip, value.split(',')))
         else:
             self.meta[key.lower()] = value
 
     def parse_post_header(self):
         """
-        Extracts the title from any .rst document
+        Extracts the title and leading meta fields from any .rst document.
+        Lines are read lazily and reading stops right after the title.
         """
-        attr_pattern = r":([A-Za-z_-]+):\s*([A-Za-z0-9-/ ]+)"
+        read_size = 0
         with open(self.path, encoding="latin-1") as fff:
-            lines = iter(fff.readlines())
-            try:
-                while not self.title:
-                    line = next(lines).strip()
-                    if re.match(self.title_patttern, line):
-                        self.title = next(lines)
-                    if meta_attr:=re.findall(attr_pattern, line):
-                        self.parse_meta_values(*meta_attr[0])
-            except StopIteration:
-                raise TypeError(f"File {self.path} does not have a title")
+            for line in fff:
+                read_size += len(line)
+                if read_size > self.max_header_size:
+                    raise TypeError(
+                        f"File {self.path} does not have a title in its "
+                        f"first {self.max_header_size} bytes"
+                    )
+                line = line.strip()
+                if TITLE_PATTERN.match(line):
+                    self.title = next(fff, "")
+                    if self.title:
+                        return
+                if meta_attr := META_PATTERN.search(line):
+                    self.parse_meta_values(*meta_attr.groups())
+        raise TypeError(f"File {self.path} does not have a title")
+
+
+def read_post_header(post_path):
+    """
+    Parses the header of ``post_path``. Module level so processes can run it
+    """
+    return Post(post_path).get_header()
+
+
+def map_posts(func, post_paths, workers=1, executor="thread"):
+    """
+    ``map(func, post_paths)`` run by a pool of ``workers``, keeping the order.
+    ``workers=0`` lets the pool choose, ``1`` runs in this thread
+    """
+    if workers == 1 or len(post_paths) < 2:
+        return list(map(func, post_paths))
+    workers = workers or None
+    if executor == "process":
+        chunksize = max(1, len(post_paths) // (4 * (workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, post_paths, chunksize=chunksize))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, post_paths))
+
+
+class PostHeaderCache:
+    """
+    Parsed post headers stored on disk between builds. Entries are only
+    valid while the post keeps the same mtime and size.
+    """
+    version = 3
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.headers = {}
+        self.modified = False
+        try:
+            with open(cache_path, "rb") as fff:
+                version, headers = pickle.load(fff)
+            if version == self.version:
+                self.headers = headers
+        except Exception:
+            # Missing or unreadable cache, every post is parsed again
+            pass
+
+    def get(self, post_path, stat):
+        """
+        Returns the cached header of ``post_path`` or ``None`` if stale
+        """
+        entry = self.headers.get(post_path)
+        if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return entry[2]
+        return None
+
+    def set(self, post_path, stat, header):
+        self.headers[post_path] = (stat.st_mtime_ns, stat.st_size, header)
+        self.modified = True
+
+    def prune(self, posts_path, post_paths):
+        """
+        Forgets posts under ``posts_path`` other than ``post_paths``, as
+        deleted or renamed ones
+        """
+        prefix = os.path.join(posts_path, "")
+        post_paths = set(post_paths)
+        for post_path in [x for x in self.headers if x.startswith(prefix)]:
+            if post_path not in post_paths:
+                del self.headers[post_path]
+                self.modified = True
+
+    def retain(self, posts_paths):
+        """
+        Forgets posts outside every folder of ``posts_paths``
+        """
+        prefixes = tuple(os.path.join(x, "") for x in posts_paths)
+        for post_path in [x for x in self.headers if not x.startswith(prefixes)]:
+            del self.headers[post_path]
+            self.modified = True
+
+    def save(self):
+        """
+        Writes the cache to disk if something changed
+        """
+        if not self.modified:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, "wb") as fff:
+            pickle.dump((self.version, self.headers), fff, pickle.HIGHEST_PROTOCOL)
+        self.modified = False
 
 
 ###############################################################################
@@ -67,23 +255,150 @@ class Post:
 ###############################################################################
 class Posts(nodes.Admonition, nodes.Element):
     @staticmethod
-    def get_posts(posts_path, reverse=True): # Reverse True -> Newest first
-        posts = []
+    def get_posts(
+        posts_path, reverse=True, header_cache=None, workers=1, executor="thread"
+    ): # Reverse True -> Newest first
+        """
+        Posts under ``posts_path``. Headers not found in ``header_cache`` are
+        parsed by ``workers`` threads, or processes if ``executor='process'``
+        """
         main_dir = os.path.basename(posts_path)
+        post_groups = {}
         for parent_path, _, files in os.walk(posts_path):
             if (parent := os.path.basename(parent_path)) == main_dir:
                 parent = ""
+            for file in files:
+                if file.lower().endswith(".rst"):
+                    post_groups[os.path.join(parent_path, file)] = parent
+        # Sorted, so posts with the same date are always in the same order
+        post_paths = sorted(post_groups)
+        headers = {}
+        if header_cache is not None:
+            stats = {post_path: os.stat(post_path) for post_path in post_paths}
+            for post_path in post_paths:
+                if header := header_cache.get(post_path, stats[post_path]):
+                    headers[post_path] = header
+            header_cache.prune(posts_path, post_paths)
+        missing = [x for x in post_paths if x not in headers]
+        parsed = map_posts(read_post_header, missing, workers, executor)
+        for post_path, header in zip(missing, parsed):
+            # Group
+            header["group"] = post_groups[post_path]
+            headers[post_path] = header
+            if header_cache is not None:
+                header_cache.set(post_path, stats[post_path], header)
+        posts = []
+        for post_path in post_paths:
+            post = Post.from_header(post_path, headers[post_path])
+            # Ignore drafts
+            if not post.meta.get("draft"):
+                posts.append(post)
+        return sorted(posts, key=lambda x: x.ordinal, reverse=reverse)
+
+    @staticmethod
+    def get_env_posts(env, posts_path, reverse=True):
+        """
+        Same as ``get_posts`` but taking posts from the documents already read
+        by Sphinx. ``posts_path`` must be inside the source directory
+        """
+        posts = []
+        main_dir = os.path.relpath(posts_path, env.srcdir).replace(os.sep, "/")
+        for docname in sorted(env.found_docs):
+            if main_dir != "." and not docname.startswith(main_dir + "/"):
+                continue
+            if docname not in env.titles:
+                continue
+            post = Post.from_env(env, docname)
+            # Group
+            if (parent := posixpath.dirname(docname)) in (main_dir, ""):
+                post.group = ""
+            else:
+                post.group = posixpath.basename(parent)
+            # Ignore drafts
+            if not post.meta.get("draft"):
+                posts.append(post)
+        return sorted(posts, key=lambda x: x.ordinal, reverse=reverse)
+
+
+class PostsIndex:
+    """
+    Posts found under ``posts_path``, shared by every ``posts`` directive
+    pointing there. Posts are only parsed again when a file under that
+    path is added, removed or modified.
+    """
+
+    def __init__(self, posts_path):
+        self.posts_path = posts_path
+        self.signature = None
+        self.posts = []
+        # Rendered listings, see ``render_posts_list``. Only valid for a build
+        self.fragments = {}
+
+    def __getstate__(self):
+        # Not worth pickling with the environment
+        return dict(self.__dict__, fragments={})
+
+    def scan(self):
+        """
+        Returns ``(path, mtime)`` of every ``.rst`` file under ``posts_path``
+        """
+        signature = []
+        for parent_path, _, files in os.walk(self.posts_path):
             for file in files:
                 if not file.lower().endswith(".rst"):
                     continue
                 file_path = os.path.join(parent_path, file)
-                post = Post(file_path)
-                # Group
-                post.group = parent
-                # Ignore drafts
-                if not post.meta.get("draft"):
-                    posts.append(post)
-        return sorted(posts, key=lambda x: x.date.toordinal(), reverse=reverse)
+                signature.append((file_path, os.stat(file_path).st_mtime_ns))
+        return tuple(sorted(signature))
+
+    def refresh(self, header_cache=None, env=None, workers=1, executor="thread"):
+        """
+        Parses posts again if files changed. Returns ``True`` if it did.
+        Given ``env``, posts inside the project come from Sphinx instead
+        """
+        self.fragments = {}
+        if env is not None and is_inside(self.posts_path, env.srcdir):
+            self.posts = Posts.get_env_posts(env, self.posts_path)
+            self.signature = None
+            return True
+        signature = self.scan()
+        if signature == self.signature:
+            return False
+        self.posts = Posts.get_posts(
+            self.posts_path,
+            header_cache=header_cache,
+            workers=workers,
+            executor=executor,
+        )
+        self.signature = signature
+        return True
+
+
+def get_posts_index(env, posts_path, refresh=False, header_cache=None):
+    """
+    Returns the build-wide index for ``posts_path``, creating it if needed
+    """
+    if not hasattr(env, "pj_posts_indexes"):
+        env.pj_posts_indexes = {}
+    if (index := env.pj_posts_indexes.get(posts_path)) is None:
+        index = env.pj_posts_indexes[posts_path] = PostsIndex(posts_path)
+        refresh = True
+    if refresh:
+        index.refresh(
+            header_cache=header_cache,
+            env=env if env.config.pj_posts_from_env else None,
+            workers=env.config.pj_posts_workers,
+            executor=env.config.pj_posts_executor,
+        )
+    return index
+
+
+def is_inside(path, parent_path):
+    """
+    Whether ``path`` is ``parent_path`` or any folder below it
+    """
+    path, parent_path = os.path.abspath(path), os.path.abspath(parent_path)
+    return os.path.commonpath((path, parent_path)) == parent_path
 
 
 def visit_Posts_node(self, node):
@@ -103,11 +418,32 @@ class PostsDirective(SphinxDirective):
     final_argument_whitespace = False
     option_spec = dict(
         opposite=directives.flag,
+        limit=directives.positive_int,
+        group=directives.unchanged,
+        archive=directives.flag,
     )
+    option_spec["per-page"] = directives.positive_int
 
+    @profile_directive
     def run(self):
-        #posts = self.get_posts(self.options["path"])
-        posts_node = Posts(self.arguments[0])
+        options = {
+            key: value for key, value in self.options.items()
+            if key in ("limit", "per-page", "group")
+        }
+        if "archive" in self.options:
+            options["archive"] = True
+        posts_node = Posts(self.arguments[0], **options)
+        self.set_source_info(posts_node)
+        # Listings in use, so indexes and extra pages are made before writing
+        if not hasattr(self.env, "pj_posts_listings"):
+            self.env.pj_posts_listings = {}
+        listings = self.env.pj_posts_listings.setdefault(self.env.docname, [])
+        if "per-page" in options and any("per-page" in x for _, x in listings):
+            logger.warning(
+                "Only one paginated posts listing per document is supported",
+                location=posts_node,
+            )
+        listings.append((self.arguments[0], options))
         self.state.nested_parse(
             self.content, self.content_offset, posts_node
         )
@@ -115,13 +451,79 @@ class PostsDirective(SphinxDirective):
 
 
 ###############################################################################
-# Handlers
+# Rendering
 ###############################################################################
-def process_posts_nodes(app, doctree, fromdocname):
-    for posts_node in doctree.traverse(Posts):
-        output = '<ul class="posts-list">'
-        posts_path = os.path.join(app.confdir, posts_node.rawsource)
-        posts = posts_node.get_posts(posts_path)
+def select_posts(posts, group=None):
+    """
+    Posts of ``group``, all of them if ``None``
+    """
+    if group is None:
+        return posts
+    return [post for post in posts if post.group == group]
+
+
+def paginate_posts(posts, per_page=None):
+    """
+    Splits posts in pages of ``per_page`` posts. There is always one page
+    """
+    if not per_page:
+        return [posts]
+    return [
+        posts[start:start + per_page]
+        for start in range(0, len(posts), per_page)
+    ] or [[]]
+
+
+def page_name(docname, page):
+    """
+    Page 1 is the document with the listing, others are generated next to it
+    """
+    return docname if page == 1 else f"{docname}-page{page}"
+
+
+def group_slug(group):
+    """
+    ``group`` as safe in paths and URLs, as archive pages and feeds use it
+    """
+    group = unicodedata.normalize("NFKD", group).encode("ascii", "ignore").decode()
+    return GROUP_SLUG_PATTERN.sub("-", group.strip()).strip("-").lower()
+
+
+def archive_page_name(docname, group, year):
+    if group:
+        # Groups with nothing left in their slug still get their own pages
+        slug = group_slug(group) or hashlib.sha1(group.encode("utf-8")).hexdigest()[:8]
+        return f"{docname}-archive/{slug}/{year}"
+    return f"{docname}-archive/{year}"
+
+
+def get_archive(posts):
+    """
+    Posts split by group and year, as ``{(group, year): posts}``
+    """
+    archive = {}
+    for post in posts:
+        archive.setdefault((post.group, post.date.year), []).append(post)
+    return archive
+
+
+def root_prefix(app, docname):
+    """
+    Relative path from the page of ``docname`` to the root of the site
+    """
+    return "../" * app.builder.get_target_uri(docname).count("/")
+
+
+def render_posts_list(app, posts, fromdocname, fragments=None, key=None):
+    """
+    Renders ``posts`` as links relative to ``fromdocname``. Given a
+    ``fragments`` dict, the listing is rendered once per ``key`` with
+    links from the root and only their prefix is set for each page
+    """
+    if fragments is not None and key in fragments:
+        fragment = fragments[key]
+    else:
+        entries = ['<ul class="posts-list">']
         for post in posts:
             if not post.title:
                 continue
@@ -134,13 +536,237 @@ def process_posts_nodes(app, doctree, fromdocname):
             post_date = ('<span class="post-date">'
                          f'{post.date.strftime("%d/%m/%Y")}</span>')
             # Post link
-            post_link = app.project.path2doc(post.path) + ".html"
+            post_link = app.builder.get_target_uri(
+                app.project.path2doc(post.path)
+            )
             # All together
-            output += (
-                f'<li><a href="{post_link}"><div class="post-entry">'
-                f'{post_group}{post_date}{post_title} '
+            entries.append(
+                f'<li><a href="{ROOT_PLACEHOLDER}{post_link}">'
+                f'<div class="post-entry">{post_group}{post_date}{post_title} '
                 '</div></a></li>'
             )
-        output += "</ul>"
-        posts_node.replace_self(nodes.raw("", output, format="html"))
+        entries.append("</ul>")
+        fragment = "".join(entries)
+        if fragments is not None:
+            fragments[key] = fragment
+    return fragment.replace(ROOT_PLACEHOLDER, root_prefix(app, fromdocname))
+
+
+def render_pagination(app, docname, page, pages, fromdocname):
+    if pages <= 1:
+        return ''
+    output = '<nav class="posts-pagination">'
+    if page > 1:
+        link = app.builder.get_relative_uri(
+            fromdocname, page_name(docname, page - 1)
+        )
+        output += f'<a class="posts-newer" href="{link}">&lArr;</a>'
+    output += f'<span class="posts-page">{page}/{pages}</span>'
+    if page < pages:
+        link = app.builder.get_relative_uri(
+            fromdocname, page_name(docname, page + 1)
+        )
+        output += f'<a class="posts-older" href="{link}">&rArr;</a>'
+    output += "</nav>"
+    return output
+
+
+def render_archive(app, docname, archive, fromdocname):
+    years = {}
+    for group, year in sorted(archive, key=lambda x: (x[0], -x[1])):
+        link = app.builder.get_relative_uri(
+            fromdocname, archive_page_name(docname, group, year)
+        )
+        years.setdefault(group, []).append(f'<a href="{link}">{year}</a>')
+    output = '<div class="posts-archive">'
+    for group, links in years.items():
+        post_group = f'<span class="post-group">{group}</span>' if group else ''
+        output += f'<p>{post_group}{" ".join(links)}</p>'
+    output += "</div>"
+    return output
 
+
+###############################################################################
+# Handlers
+###############################################################################
+def purge_posts_listings(app, env, docname):
+    if hasattr(env, "pj_posts_listings"):
+        env.pj_posts_listings.pop(docname, None)
+
+
+def merge_posts_listings(app, env, docnames, other):
+    if not hasattr(env, "pj_posts_listings"):
+        env.pj_posts_listings = {}
+    # Only the documents the worker read, its copy of others may be stale
+    other_listings = getattr(other, "pj_posts_listings", {})
+    env.pj_posts_listings.update(
+        (docname, other_listings[docname])
+        for docname in docnames if docname in other_listings
+    )
+
+
+def get_listing_signature(app, env, listings):
+    """
+    Digest of what the ``listings`` of a document show: link, title, day
+    and group of their posts, in order. It only changes when the rendered
+    listing would
+    """
+    shown = []
+    for posts_path, options in listings:
+        index = get_posts_index(env, os.path.join(app.confdir, posts_path))
+        posts = select_posts(index.posts, options.get("group"))
+        if not options.get("archive"):
+            posts = posts[:options.get("limit")]
+        shown.append((posts_path, sorted(options.items()), [
+            (post.path, post.title, post.ordinal, post.group)
+            for post in posts
+        ]))
+    return hashlib.sha1(repr(shown).encode("utf-8")).hexdigest()
+
+
+def update_posts_indexes(app, env):
+    """
+    Builds (or refreshes) once per build the index of every posts folder.
+    Returns the documents whose listings changed, so they are written again
+    even if their source did not
+    """
+    listings = getattr(env, "pj_posts_listings", {})
+    posts_paths = set()
+    for doc_listings in listings.values():
+        posts_paths.update(
+            os.path.join(app.confdir, posts_path)
+            for posts_path, _ in doc_listings
+        )
+    # Forget folders no directive points to anymore
+    for posts_path in set(getattr(env, "pj_posts_indexes", {})) - posts_paths:
+        del env.pj_posts_indexes[posts_path]
+    header_cache = PostHeaderCache(
+        os.path.join(app.doctreedir, "pj_post_headers.pickle")
+    )
+    for posts_path in posts_paths:
+        get_posts_index(env, posts_path, refresh=True, header_cache=header_cache)
+    header_cache.retain(posts_paths)
+    header_cache.save()
+    # Documents whose listings show something else than last build
+    previous = getattr(env, "pj_posts_listing_signatures", {})
+    env.pj_posts_listing_signatures = {
+        docname: get_listing_signature(app, env, doc_listings)
+        for docname, doc_listings in listings.items()
+    }
+    outdated = sorted(
+        docname for docname, signature in env.pj_posts_listing_signatures.items()
+        if previous.get(docname) != signature
+    )
+    if outdated:
+        logger.info(f"{len(outdated)} posts listing(s) changed: {', '.join(outdated)}")
+    return outdated
+
+
+def process_posts_nodes(app, doctree, fromdocname):
+    for posts_node in doctree.traverse(Posts):
+        with profiled(app.config, f"posts listing {fromdocname}:{posts_node.line}"):
+            process_posts_node(app, posts_node, fromdocname)
+
+
+def process_posts_node(app, posts_node, fromdocname):
+    posts_path = os.path.join(app.confdir, posts_node.rawsource)
+    index = get_posts_index(app.env, posts_path)
+    group = posts_node.get("group")
+    limit = posts_node.get("limit")
+    per_page = posts_node.get("per-page")
+    posts = select_posts(index.posts, group)
+    pages = paginate_posts(posts[:limit], per_page)
+    output = render_posts_list(
+        app, pages[0], fromdocname,
+        index.fragments, (group, limit, per_page, 1),
+    )
+    output += render_pagination(app, fromdocname, 1, len(pages), fromdocname)
+    if posts_node.get("archive"):
+        archive = get_archive(posts)
+        output += render_archive(app, fromdocname, archive, fromdocname)
+    posts_node.replace_self(nodes.raw("", output, format="html"))
+
+
+def get_listed_posts(app):
+    """
+    Every post listed by some ``posts`` directive, as ``(docname, post)``
+    newest first. Posts outside the project or without title are left out
+    """
+    listed = {}
+    for index in getattr(app.env, "pj_posts_indexes", {}).values():
+        for post in index.posts:
+            docname = app.project.path2doc(post.path)
+            if post.title and docname is not None:
+                listed[docname] = post
+    return sorted(
+        listed.items(), key=lambda x: (x[1].ordinal, x[0]), reverse=True
+    )
+
+
+def get_posts_search_index(app):
+    """
+    Compact index of every listed post: title, group, date, link (from the
+    root) and tags, newest first
+    """
+    posts = []
+    for docname, post in get_listed_posts(app):
+        tags = post.meta.get("tags", [])
+        posts.append([
+            post.title.strip(),
+            post.group,
+            post.date.strftime("%Y-%m-%d"),
+            app.builder.get_target_uri(docname),
+            [tags] if isinstance(tags, str) else tags,
+        ])
+    return dict(fields=["title", "group", "date", "link", "tags"], posts=posts)
+
+
+def write_posts_search_index(app, exc=None):
+    """
+    Writes ``posts-index.json`` for the search page. The file is left
+    untouched if its content did not change
+    """
+    if exc or app.builder.format != "html" or not app.config.pj_posts_search_index:
+        return
+    content = json.dumps(
+        get_posts_search_index(app), ensure_ascii=False, separators=(",", ":")
+    )
+    write_if_changed(os.path.join(app.builder.outdir, "posts-index.json"), content)
+
+
+def collect_posts_pages(app):
+    """
+    Generates the extra pages of paginated listings and their archives
+    """
+    for docname, listings in getattr(app.env, "pj_posts_listings", {}).items():
+        title = app.env.titles[docname].astext() if docname in app.env.titles else ''
+        for posts_path, options in listings:
+            posts_path = os.path.join(app.confdir, posts_path)
+            index = get_posts_index(app.env, posts_path)
+            group = options.get("group")
+            limit = options.get("limit")
+            per_page = options.get("per-page")
+            posts = select_posts(index.posts, group)
+            pages = paginate_posts(posts[:limit], per_page)
+            for page, page_posts in enumerate(pages[1:], 2):
+                pagename = page_name(docname, page)
+                body = render_posts_list(
+                    app, page_posts, pagename,
+                    index.fragments, (group, limit, per_page, page),
+                )
+                body += render_pagination(app, docname, page, len(pages), pagename)
+                context = dict(title=f"{title} ({page}/{len(pages)})", body=body)
+                yield pagename, context, "page.html"
+            if not options.get("archive"):
+                continue
+            for (post_group, year), archive_posts in get_archive(posts).items():
+                pagename = archive_page_name(docname, post_group, year)
+                body = render_posts_list(
+                    app, archive_posts, pagename,
+                    index.fragments, ("archive", post_group, year),
+                )
+                context = dict(
+                    title=f"{post_group} {year}" if post_group else str(year),
+                    body=body,
+                )
+                yield pagename, context, "page.html"
@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import time
+import inspect
+import functools
+from contextlib import contextmanager
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Records of the current process,
+# ``{name: [calls, seconds, files, bytes opened]}``
+RECORDS = {}
+# Records being measured right now, innermost last
+ACTIVE = []
+AUDIT_HOOK_ADDED = False
+
+
+###############################################################################
+# Recording
+###############################################################################
+def audit_open(event, args):
+    """
+    Counts files opened for reading and their full size in every active
+    record. There is no audit event for reads, so a file only partly read
+    counts whole. Opens from thread pools started by a handler count for
+    that handler
+    """
+    if event != "open" or not ACTIVE:
+        return
+    path, mode, flags = args
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return
+    if mode is not None:
+        reading = "r" in mode or "+" in mode
+    else:
+        reading = (flags & os.O_ACCMODE) in (os.O_RDONLY, os.O_RDWR)
+    if not reading:
+        return
+    try:
+        size = os.stat(path).st_size
+    except OSError:
+        return
+    for record in ACTIVE:
+        record[2] += 1
+        record[3] += size
+
+
+@contextmanager
+def profiled(config, name, records=None):
+    """
+    Measures the block as ``name`` (wall time, calls, files and bytes opened)
+    if ``pj_profile`` is on. ``records`` defaults to those of this process
+    """
+    if not config.pj_profile:
+        yield
+        return
+    global AUDIT_HOOK_ADDED
+    if not AUDIT_HOOK_ADDED:
+        # Audit hooks can't be removed, ``audit_open`` is a no-op when idle
+        sys.addaudithook(audit_open)
+        AUDIT_HOOK_ADDED = True
+    record = (RECORDS if records is None else records).setdefault(name, [0, 0.0, 0, 0])
+    ACTIVE.append(record)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record[0] += 1
+        record[1] += time.perf_counter() - start
+        ACTIVE.remove(record)
+
+
+def profile_handler(func, name=None):
+    """
+    Wraps an event handler so it is measured when profiling. Generator
+    handlers, as ``html-collect-pages`` ones, are measured while consumed
+    """
+    name = name or func.__name__
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(app, *args):
+            with profiled(app.config, name):
+                yield from func(app, *args)
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(app, *args):
+        with profiled(app.config, name):
+            return func(app, *args)
+    return wrapper
+
+
+def profile_directive(run):
+    """
+    Wraps ``run`` of a directive so each instance is measured on its own.
+    Records live in the environment, so parallel reads keep them
+    """
+    @functools.wraps(run)
+    def wrapper(self):
+        env = self.env
+        if not env.config.pj_profile:
+            return run(self)
+        if not hasattr(env, "pj_profile_docs"):
+            env.pj_profile_docs = {}
+        records = env.pj_profile_docs.setdefault(env.docname, {})
+        name = f"{self.name}:: {env.docname}:{self.lineno}"
+        with profiled(env.config, name, records):
+            return run(self)
+    return wrapper
+
+
+###############################################################################
+# Handlers
+###############################################################################
+def start_profile(app):
+    """
+    Forgets the records of previous builds
+    """
+    RECORDS.clear()
+    if hasattr(app.env, "pj_profile_docs"):
+        del app.env.pj_profile_docs
+
+
+def purge_profile(app, env, docname):
+    if hasattr(env, "pj_profile_docs"):
+        env.pj_profile_docs.pop(docname, None)
+
+
+def merge_profile(app, env, docnames, other):
+    if not hasattr(env, "pj_profile_docs"):
+        env.pj_profile_docs = {}
+    other_docs = getattr(other, "pj_profile_docs", {})
+    env.pj_profile_docs.update(
+        (docname, other_docs[docname]) for docname in docnames if docname in other_docs
+    )
+
+
+def get_profile(app):
+    """
+    Every record of this build, slowest first
+    """
+    records = dict(RECORDS)
+    for doc_records in getattr(app.env, "pj_profile_docs", {}).values():
+        records.update(doc_records)
+    return {
+        name: dict(calls=calls, seconds=seconds, files=files, bytes_opened=size)
+        for name, (calls, seconds, files, size) in sorted(
+            records.items(), key=lambda x: x[1][1], reverse=True
+        )
+    }
+
+
+def report_profile(app, exc=None):
+    """
+    Logs a summary table of the records and dumps them as JSON to
+    ``pj_profile_output`` (``pj_profile.json`` in the doctrees folder by
+    default). Handlers run in parallel writer processes are not counted.
+    Sizes are of the files opened, not of what was read from them
+    """
+    if not app.config.pj_profile:
+        return
+    profile = get_profile(app)
+    width = max([len(name) for name in profile] + [len("name")])
+    logger.info(f"{'name':<{width}}  {'calls':>7}  {'ms':>10}  {'files':>7}  {'KiB opened':>10}")
+    for name, record in profile.items():
+        logger.info(
+            f"{name:<{width}}  {record['calls']:>7}  "
+            f"{record['seconds'] * 1000:>10.1f}  {record['files']:>7}  "
+            f"{record['bytes_opened'] / 1024:>10.1f}"
+        )
+    output = app.config.pj_profile_output or os.path.join(
+        app.doctreedir, "pj_profile.json"
+    )
+    output = os.path.join(app.confdir, output)
+    with open(output, "w", encoding="utf-8") as fff:
+        json.dump(profile, fff, indent=1)
+    logger.info(f"Profile written to {output}")
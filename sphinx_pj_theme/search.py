@@ -0,0 +1,81 @@
+import os
+import json
+from sphinx.util import logging
+from .utils import write_if_changed
+
+logger = logging.getLogger(__name__)
+
+
+SEARCH_INDEX_PREFIX = "Search.setIndex("
+SHARDS_DIR = "_search"
+SHARDED_FIELDS = ("terms", "titleterms")
+
+
+###############################################################################
+# Sharding
+###############################################################################
+def load_search_index(index_path):
+    """
+    Reads the index that Sphinx writes as ``Search.setIndex({...})``
+    """
+    with open(index_path, encoding="utf-8") as fff:
+        content = fff.read().strip()
+    if not (content.startswith(SEARCH_INDEX_PREFIX) and content.endswith(")")):
+        raise ValueError(f"{index_path} is not a Sphinx search index")
+    return json.loads(content[len(SEARCH_INDEX_PREFIX):-1])
+
+
+def shard_search_index(search_index, prefix_length=2):
+    """
+    Splits the terms of ``search_index`` by their first ``prefix_length``
+    characters. Returns the base index (everything but the terms, plus the
+    shard of every prefix) and the list of shards
+    """
+    shards = {}
+    for field in SHARDED_FIELDS:
+        for term, files in search_index.get(field, {}).items():
+            shard = shards.setdefault(term[:prefix_length], {})
+            shard.setdefault(field, {})[term] = files
+    prefixes = sorted(shards)
+    base = {k: v for k, v in search_index.items() if k not in SHARDED_FIELDS}
+    base["shards"] = dict(
+        prefix_length=prefix_length,
+        prefixes={prefix: number for number, prefix in enumerate(prefixes)},
+    )
+    return base, [shards[prefix] for prefix in prefixes]
+
+
+def dump_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+###############################################################################
+# Handlers
+###############################################################################
+def write_search_shards(app, exc=None):
+    """
+    Splits ``searchindex.js`` in ``_search/index.json`` and one
+    ``_search/<n>.json`` per term prefix, so the search page only downloads
+    the shards of the words being searched
+    """
+    prefix_length = app.config.pj_search_shard_prefix_length
+    if exc or app.builder.format != "html" or not prefix_length:
+        return
+    index_path = os.path.join(app.builder.outdir, "searchindex.js")
+    if not os.path.isfile(index_path):
+        return
+    base, shards = shard_search_index(load_search_index(index_path), prefix_length)
+    shards_dir = os.path.join(app.builder.outdir, SHARDS_DIR)
+    os.makedirs(shards_dir, exist_ok=True)
+    written = write_if_changed(os.path.join(shards_dir, "index.json"), dump_json(base))
+    shard_files = {"index.json"}
+    for number, shard in enumerate(shards):
+        shard_files.add(f"{number}.json")
+        shard_path = os.path.join(shards_dir, f"{number}.json")
+        written += write_if_changed(shard_path, dump_json(shard))
+    # Shards of prefixes that are gone
+    for file in set(os.listdir(shards_dir)) - shard_files:
+        os.remove(os.path.join(shards_dir, file))
+    logger.info(
+        f"Search index split in {len(shards)} shard(s), {written} file(s) updated"
+    )
@@ -0,0 +1,14 @@
+def write_if_changed(path, content):
+    """
+    Writes ``content`` to ``path`` unless it is already there, so unchanged
+    files keep their mtime. Returns ``True`` if it wrote
+    """
+    try:
+        with open(path, encoding="utf-8") as fff:
+            if fff.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, "w", encoding="utf-8") as fff:
+        fff.write(content)
+    return True
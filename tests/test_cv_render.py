@@ -0,0 +1,59 @@
+"""
+CV sections render the same whatever runs them: the language is passed per
+render, so builds with ``-j`` can render both languages at once.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from sphinx_pj_theme import cv
+from sphinx_pj_theme.cv_items import render_section
+
+LANGUAGES = ("english", "español")
+SECTIONS = {
+    "experience": (cv.CVExperiences, [
+        {
+            "position": f"Position {number}",
+            "employer": f"Employer {number}",
+            "start": f"20{number:02d}-01",
+            "end": "Now" if number == 0 else f"20{number:02d}-12",
+            "description": "Did things",
+            "projects": [
+                {"description": "A project", "tech-stack": ["Python", "SQL"]},
+            ],
+        }
+        for number in range(10)
+    ]),
+    "side-project": (cv.CVSideProjects, [
+        {
+            "title": f"Side project {number}",
+            "description": "Made things",
+            "collaborators": [{"name": "Jane Doe", "url": "https://example.com"}],
+        }
+        for number in range(10)
+    ]),
+}
+RENDERS = [(section, lang) for section in SECTIONS for lang in LANGUAGES] * 8
+
+
+def render(section, lang):
+    node_class, items = SECTIONS[section]
+    return render_section(node_class.process_items(items), f"cv-{section}", lang)
+
+
+def render_all(executor):
+    with executor as pool:
+        return list(pool.map(render, *zip(*RENDERS)))
+
+
+def test_languages_differ():
+    assert render("experience", "english") != render("experience", "español")
+    assert render("side-project", "english") != render("side-project", "español")
+
+
+def test_threads_render_as_serial():
+    expected = [render(section, lang) for section, lang in RENDERS]
+    assert render_all(ThreadPoolExecutor(8)) == expected
+
+
+def test_processes_render_as_serial():
+    expected = [render(section, lang) for section, lang in RENDERS]
+    assert render_all(ProcessPoolExecutor(4)) == expected
@@ -0,0 +1,82 @@
+"""
+Responsive image derivatives and their markup
+"""
+import os
+
+import pytest
+from sphinx.testing.util import SphinxTestApp
+
+from sphinx_pj_theme.images import get_sources
+
+CONF = """\
+extensions = ["sphinx_pj_theme"]
+html_theme = "sphinx_pj_theme"
+pj_images = {pj_images}
+pj_image_formats = ["webp"]
+"""
+INDEX = """\
+Home
+====
+
+.. image:: small.png
+
+.. image:: large.png
+"""
+
+
+def test_sources_without_source_format_derivatives():
+    # Narrower than every width: only a full width copy in other formats
+    entry = dict(
+        width=200, format="png",
+        derivatives=[(200, "webp", "small.0123456789-200.webp")],
+    )
+    env = type("Env", (), {"pj_images": {"small.png": entry}})
+    assert get_sources(env, "small.png", "_images/small.png", "_images") == [
+        ("image/webp", "_images/small.0123456789-200.webp 200w"),
+        ("image/png", "_images/small.png 200w"),
+    ]
+
+
+def build_site(tmp_path, pj_images):
+    with open(os.path.join(tmp_path, "conf.py"), "w") as fff:
+        fff.write(CONF.format(pj_images=pj_images))
+    with open(os.path.join(tmp_path, "index.rst"), "w") as fff:
+        fff.write(INDEX)
+    app = SphinxTestApp("html", srcdir=tmp_path)
+    try:
+        app.build()
+    finally:
+        app.cleanup()
+    with open(os.path.join(app.outdir, "index.html"), encoding="utf-8") as fff:
+        return app, fff.read()
+
+
+@pytest.fixture
+def images(tmp_path):
+    image = pytest.importorskip("PIL.Image")
+    features = pytest.importorskip("PIL.features")
+    if not features.check("webp"):
+        pytest.skip("Pillow without WebP")
+    image.new("RGB", (200, 100)).save(os.path.join(tmp_path, "small.png"))
+    image.new("RGB", (800, 400)).save(os.path.join(tmp_path, "large.png"))
+    return tmp_path
+
+
+def test_derivatives(images):
+    app, html = build_site(images, True)
+    derivatives = sorted(os.listdir(os.path.join(app.outdir, "_images")))
+    small = [x for x in derivatives if x.startswith("small.")]
+    assert len(small) == 2 and "small.png" in small
+    assert any(x.endswith("-200.webp") for x in small)
+    assert len([x for x in derivatives if x.startswith("large.")]) == 6
+    assert html.count("<picture>") == 2
+    assert '<source type="image/webp" srcset="_images/small.' in html
+    assert 'srcset="_images/small.png 200w"' in html
+    assert "_images/large.png 800w" in html
+    assert html.count('loading="lazy"') == 2
+
+
+def test_off_keeps_image_visitor(tmp_path):
+    _, html = build_site(tmp_path, False)
+    assert "<picture>" not in html
+    assert 'loading="lazy"' not in html
@@ -0,0 +1,152 @@
+"""
+Incremental builds only write again the pages whose posts listings changed
+"""
+import os
+import time
+
+import pytest
+from sphinx.testing.util import SphinxTestApp
+
+import sphinx_pj_theme
+from sphinx_pj_theme import posts
+
+# Outside every toctree, so only its listing brings index back: Sphinx
+# writes again the documents sharing a toctree with an added post
+CONF = """\
+extensions = ["sphinx_pj_theme"]
+html_theme = "sphinx_pj_theme"
+root_doc = "contents"
+"""
+CONTENTS = """\
+Contents
+========
+
+.. toctree::
+   :glob:
+
+   posts/*/*
+   about
+"""
+INDEX = """\
+:orphan:
+
+Home
+====
+
+.. posts:: posts
+"""
+POST = """\
+:date: {day:02d}/02/2023
+
+{title}
+{underline}
+
+Body
+"""
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fff:
+        fff.write(content)
+    # Newer than the last build whatever the filesystem mtime resolution
+    future = time.time() + 10
+    os.utime(path, (future, future))
+
+
+def write_post(srcdir, name, title, day):
+    write(
+        os.path.join(srcdir, "posts", "python", f"{name}.rst"),
+        POST.format(title=title, underline="=" * len(title), day=day),
+    )
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """
+    Builds the site in ``tmp_path``, returning the docnames
+    ``update_posts_indexes`` asked to write again
+    """
+    write(os.path.join(tmp_path, "conf.py"), CONF)
+    write(os.path.join(tmp_path, "contents.rst"), CONTENTS)
+    write(os.path.join(tmp_path, "index.rst"), INDEX)
+    write(os.path.join(tmp_path, "about.rst"), "About\n=====\n\nMe\n")
+    for day in range(1, 4):
+        write_post(tmp_path, f"post{day}", f"Post {day}", day)
+    # Older than the first build, else every page would always be outdated
+    past = time.time() - 100
+    for parent_path, _, files in os.walk(tmp_path):
+        for file in files:
+            os.utime(os.path.join(parent_path, file), (past, past))
+    outdated = []
+
+    def update_posts_indexes(app, env):
+        outdated.append(posts.update_posts_indexes(app, env))
+        return outdated[-1]
+
+    # ``setup`` connects the name it finds in the package
+    monkeypatch.setattr(sphinx_pj_theme, "update_posts_indexes", update_posts_indexes)
+
+    def build():
+        app = SphinxTestApp("html", srcdir=tmp_path)
+        try:
+            app.build()
+        finally:
+            app.cleanup()
+        return outdated[-1]
+
+    return build
+
+
+def test_first_build_writes_listings(site):
+    assert site() == ["index"]
+
+
+def test_nothing_changed(site):
+    site()
+    assert site() == []
+
+
+def test_title_edit(tmp_path, site):
+    site()
+    write_post(tmp_path, "post2", "Post 2 renamed", 2)
+    assert site() == ["index"]
+
+
+def test_body_edit(tmp_path, site):
+    site()
+    post_path = os.path.join(tmp_path, "posts", "python", "post2.rst")
+    with open(post_path, encoding="utf-8") as fff:
+        content = fff.read()
+    write(post_path, content + "\nMore body\n")
+    assert site() == []
+
+
+def test_page_without_listing_edit(tmp_path, site):
+    site()
+    write(os.path.join(tmp_path, "about.rst"), "About\n=====\n\nSomeone else\n")
+    assert site() == []
+
+
+def read_index(tmp_path):
+    index_path = os.path.join(tmp_path, "_build", "html", "index.html")
+    with open(index_path, encoding="utf-8") as fff:
+        return fff.read()
+
+
+def test_add_and_delete(tmp_path, site):
+    site()
+    assert "Post 4" not in read_index(tmp_path)
+    write_post(tmp_path, "post4", "Post 4", 4)
+    assert site() == ["index"]
+    assert "Post 4" in read_index(tmp_path)
+    os.remove(os.path.join(tmp_path, "posts", "python", "post4.rst"))
+    assert site() == ["index"]
+    assert "Post 4" not in read_index(tmp_path)
+
+
+def test_title_edit_written(tmp_path, site):
+    site()
+    write_post(tmp_path, "post2", "Post 2 renamed", 2)
+    site()
+    assert "Post 2 renamed" in read_index(tmp_path)